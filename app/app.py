@@ -1,12 +1,33 @@
-from flask import Flask, render_template, request, jsonify
-from pymongo import MongoClient
+from flask import Flask, render_template, request, jsonify, make_response, stream_with_context, g
+from pymongo import MongoClient, UpdateOne
 import os
+import sys
+import queue
 from datetime import datetime
-import subprocess
+from functools import wraps
 import threading
 import time
 from bson import ObjectId
 
+# Le service de scraping tourne dans le même process (modules du dossier scraper/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+from scraper_worker import ScraperWorker, ALL_LEAGUES
+from scheduler import LeagueScheduler
+from scraper_mongo import migrate_numeric_fields, migrate_match_keys
+from db_setup import (ensure_indexes, check_query_plans, bump_data_version, DATA_VERSIONS_COLLECTION,
+                      MATCH_DETAILS_COLLECTION)
+from metrics import (METRICS_COLLECTION, BET_SETTLEMENT, BETS_SETTLED, REQUEST_DURATION, RESPONSE_SIZE,
+                     start_flusher, flush, export)
+from cache import DataVersions, ResponseCache
+from events import ChangeFeed
+from opportunities import OpportunityBook
+from coordination import (LeaderLease, LeaderServices, SharedStatus, status_defaults,
+                          APP_STATE_COLLECTION, SCRAPE_REQUESTS_COLLECTION, STATUS_KEY)
+from payloads import (LEAGUES, make_etag, matches_payload, TEAMS_PROJECTION, teams_payload,
+                      team_matches_filter, team_matches_payload, stats_pipeline, stats_payload, status_payload,
+                      odd_expr, odds_unwind_stages, rounded, odds_histogram, histogram_payload, ODDS_BUCKETS,
+                      ALL_ODDS_LIMIT)
+
 app = Flask(__name__)
 
 # Connexion MongoDB
@@ -15,45 +36,50 @@ client = MongoClient(MONGO_URI)
 db = client["odds_db"]
 collection = db["matches"]
 bets_collection = db["bets"]
+odds_history_collection = db["odds_history"]
+match_details_collection = db[MATCH_DETAILS_COLLECTION]
+
+# Cache des listes de matchs, invalidé quand le scraper écrit une ligue (version de données)
+data_versions = DataVersions(db[DATA_VERSIONS_COLLECTION])
+response_cache = ResponseCache()
+
+# Diffusion temps réel (SSE) des change sets publiés par le scraper
+change_feed = ChangeFeed(db["match_changes"])
+# En WSGI, chaque flux ouvert occupe un thread : plafond bien en dessous de WEB_THREADS,
+# au-delà 503 et la page repasse au polling (en ASGI, les flux sont servis par async_api)
+MAX_STREAMS = int(os.getenv("WEB_MAX_STREAMS", str(max(1, int(os.getenv("WEB_THREADS", "16")) // 4))))
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+# Meilleures cotes et arbitrages de toutes les ligues, tenus à jour par les change sets
+opportunity_book = OpportunityBook(collection, match_details_collection, change_feed)
 
-# Configuration des ligues
-LEAGUES = {
-    "ligue-1": {"name": "Ligue 1", "country": "France", "icon": "🇫🇷"},
-    "premier-league": {"name": "Premier League", "country": "England", "icon": "🏴󠁧󠁢󠁥󠁮󠁧󠁿"},
-    "la-liga": {"name": "La Liga", "country": "Spain", "icon": "🇪🇸"},
-    "serie-a": {"name": "Serie A", "country": "Italy", "icon": "🇮🇹"},
-    "bundesliga": {"name": "Bundesliga", "country": "Germany", "icon": "🇩🇪"}
-}
-
-# Variables globales pour suivre l'état
-initial_scraping_done = False
-scraping_in_progress = False
-scraping_status = {
-    "phase": "starting",  # starting, scraping, ready
-    "message": "Initialisation...",
-    "progress": 0,
-    "leagues_done": 0,
-    "total_leagues": len(LEAGUES)
-}
+# Coordination entre workers (gunicorn) : un seul pilote du scraping, statut partagé dans MongoDB
+LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+app_state = db[APP_STATE_COLLECTION]
+scrape_requests = db[SCRAPE_REQUESTS_COLLECTION]
+scheduler_lease = LeaderLease(app_state, "scheduler", ttl=LEASE_TTL)
+shared_status = SharedStatus(app_state, STATUS_KEY, status_defaults(len(LEAGUES)))
+
+# Service de scraping en arrière-plan (jobs dédupliqués, navigateurs réutilisés) ;
+# ses écritures sont refusées dès que ce worker n'a plus le bail (job lancé avant sa perte)
+scraper_worker = ScraperWorker(collection, fence=scheduler_lease.holds)
+league_scheduler = LeagueScheduler(collection, scraper_worker)
+
+# Métriques de ce process, envoyées à la collection partagée et exportées par /metrics
+metrics_collection = db[METRICS_COLLECTION]
 
 def update_scraping_status(phase, message, progress=None):
     """Mettre à jour le statut du scraping pour l'afficher côté client"""
-    global scraping_status
+    scraping_status = dict(shared_status.get()["scraping_status"])
     scraping_status["phase"] = phase
     scraping_status["message"] = message
     if progress is not None:
         scraping_status["progress"] = progress
+    shared_status.update(scraping_status=scraping_status)
     print(f"[STATUS] {phase.upper()}: {message} ({progress}%)" if progress else f"[STATUS] {phase.upper()}: {message}")
 
 def initial_scrape():
     """Scraping initial au démarrage de l'application"""
-    global initial_scraping_done, scraping_in_progress, scraping_status
-    
-    if scraping_in_progress:
-        print("[INIT] Scraping déjà en cours, abandon...")
-        return
-    
-    scraping_in_progress = True
     update_scraping_status("starting", "Connexion à MongoDB...", 5)
     
     try:
@@ -69,119 +95,352 @@ def initial_scrape():
                 update_scraping_status("starting", f"Attente MongoDB ({i+1}/10)...", 5 + i)
                 time.sleep(2)
         
+        # Index des requêtes chaudes (idempotent) + alerte si l'une d'elles reste en COLLSCAN
+        ensure_indexes(db)
+        check_query_plans(db)
+        
+        # Anciennes cotes/scores stockés en texte, anciens documents sans match_key (sans effet si déjà migrés)
+        migrate_numeric_fields(collection)
+        migrate_match_keys(collection)
+        data_versions.invalidate()
+        
+        # Paris dont les matchs se sont terminés pendant l'arrêt de l'application
+        settle_pending_bets()
+        
         # Lancer le scraping de toutes les ligues
         update_scraping_status("scraping", "Scraping des ligues en cours...", 20)
         print("[INIT] Lancement du scraping de toutes les ligues...")
         
-        result = subprocess.run(
-            ["python", "scraper/scraper_mongo.py"],
-            timeout=300,
-            capture_output=True,
-            text=True
-        )
+        job = scraper_worker.submit()
         
-        if result.returncode == 0:
+        if not job.wait(timeout=300):
+            print("[INIT]  Timeout du scraping initial (5 minutes)")
+            update_scraping_status("ready", "Timeout - Données partielles", 100)
+        elif job.error or not all(report["matches"] for report in job.results.values()):
+            print(f"[INIT] Scraping terminé avec des erreurs: {job.error or job.results}")
+            update_scraping_status("ready", "Données partiellement chargées", 100)
+        else:
             print("[INIT]  Scraping initial terminé avec succès")
-            print(result.stdout)
             update_scraping_status("ready", "Données chargées avec succès", 100)
-        else:
-            print(f"[INIT] Scraping terminé avec des erreurs (code {result.returncode})")
-            print(result.stderr)
-            update_scraping_status("ready", "Données partiellement chargées", 100)
         
-        initial_scraping_done = True
+        shared_status.update(initial_scraping_done=True)
         
-    except subprocess.TimeoutExpired:
-        print("[INIT]  Timeout du scraping initial (5 minutes)")
-        update_scraping_status("ready", "Timeout - Données partielles", 100)
-        initial_scraping_done = True
     except Exception as e:
         print(f"[INIT]  Erreur lors du scraping initial: {e}")
         update_scraping_status("ready", f"Erreur: {str(e)[:50]}", 100)
-        initial_scraping_done = True
-    finally:
-        scraping_in_progress = False
+        shared_status.update(initial_scraping_done=True)
 
 
 def start_background_scraping():
-    """Démarrer le scraping en arrière-plan toutes les 3 minutes"""
+    """Démarrer le scraping adaptatif : chaque ligue selon ses matchs en direct et à venir"""
     def scrape_loop():
         # Attendre que le scraping initial soit terminé
-        while not initial_scraping_done:
+        while not shared_status.get()["initial_scraping_done"]:
             time.sleep(5)
         
-        print("[BACKGROUND]  Scraping automatique activé (toutes les 3 minutes)")
-        
-        while True:
-            time.sleep(180)  # 3 minutes
-            
-            if scraping_in_progress:
-                print("[BACKGROUND] Scraping déjà en cours, skip...")
-                continue
-            
-            print("[BACKGROUND]  Scraping automatique...")
-            try:
-                subprocess.run(
-                    ["python", "scraper/scraper_mongo.py"],
-                    timeout=120,
-                    capture_output=True
-                )
-                print("[BACKGROUND]  Scraping automatique terminé")
-                
-                # Mettre à jour les résultats des paris après chaque scraping
-                update_bets_results()
-                
-            except Exception as e:
-                print(f"[BACKGROUND]  Erreur: {e}")
+        if not leader_services.running:
+            # Bail perdu pendant le scraping initial : le nouveau pilote planifie
+            return
+        print("[BACKGROUND]  Scraping adaptatif activé (direct, coups d'envoi proches, ligues inactives)")
+        league_scheduler.reschedule()
+        league_scheduler.start()
     
     thread = threading.Thread(target=scrape_loop, daemon=True)
     thread.start()
 
-def update_bets_results():
-    """Mettre à jour les résultats des paris en cours"""
+def start_leader_services():
+    """Services du worker qui détient le bail : service de scraping, scraping initial, scheduler"""
+    print(f"[LEASE] {scheduler_lease.holder} pilote le scraping")
+    shared_status.reset()
+    scraper_worker.start()
+    threading.Thread(target=initial_scrape, daemon=True).start()
+    start_background_scraping()
+
+def stop_leader_services():
+    """Bail perdu : plus aucune soumission ni aucun nouveau job dans ce worker (le job en cours n'écrit plus)"""
+    global _published_state
+    print(f"[LEASE] {scheduler_lease.holder} arrête le scraping")
+    league_scheduler.stop(timeout=LEASE_TTL)
+    scraper_worker.stop()
+    _published_state = None
+
+leader_services = LeaderServices(scheduler_lease, start_leader_services, stop_leader_services)
+
+def drain_scrape_requests():
+    """Transmet au service de scraping les demandes reçues par les autres workers"""
+    while True:
+        request_doc = scrape_requests.find_one_and_delete({}, sort=[("requested_at", 1)])
+        if request_doc is None:
+            return
+        scraper_worker.submit(request_doc.get("league_id"))
+
+_published_state = None
+
+def publish_worker_state():
+    """Recopie l'état du service de scraping dans le statut partagé (seulement s'il a changé)"""
+    global _published_state
+    state = {
+        "scraping_in_progress": scraper_worker.busy,
+        "scraping_jobs": scraper_worker.active_jobs(),
+        "schedule": league_scheduler.schedule()
+    }
+    if state != _published_state:
+        shared_status.update(**state)
+        _published_state = state
+
+def run_coordinator():
+    """Boucle de chaque worker : bail du pilote, puis (pilote seulement) demandes et statut partagé"""
+    last_renewal = 0.0
+    while True:
+        try:
+            if time.monotonic() - last_renewal >= LEASE_TTL / 3:
+                last_renewal = time.monotonic()
+                scheduler_lease.try_acquire()
+        except Exception as e:
+            print(f"[LEASE] Renouvellement du bail impossible: {e}")
+        
+        try:
+            # Démarre ou arrête les services selon le bail (expiré si MongoDB reste injoignable)
+            if leader_services.sync():
+                drain_scrape_requests()
+                publish_worker_state()
+        except Exception as e:
+            print(f"[LEASE] Erreur coordination: {e}")
+        time.sleep(1)
+
+_background_started = False
+
+def start_background_services():
+    """À appeler une fois par process (python app.py ou hook post_worker_init de gunicorn)"""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    threading.Thread(target=run_coordinator, name="coordinator", daemon=True).start()
+    start_flusher(metrics_collection)
+    change_feed.add_listener(settle_finished_matches)
+    opportunity_book.start()
+
+def request_scrape(league_id=None):
+    """Soumet un scraping au pilote (directement si c'est ce worker), renvoie l'état du job"""
+    if scheduler_lease.is_leader:
+        return scraper_worker.submit(league_id).to_dict()
+    
+    key = league_id or ALL_LEAGUES
+    now = datetime.now()
+    # Une seule demande en attente par clé, comme la déduplication des jobs
+    scrape_requests.update_one(
+        {"_id": key},
+        {"$setOnInsert": {"league_id": league_id, "requested_at": now}},
+        upsert=True
+    )
+    return {
+        "key": key,
+        "leagues": [league_id] if league_id else list(LEAGUES.keys()),
+        "state": "pending",
+        "submitted_at": now.isoformat()
+    }
+
+def on_scrape_done(job):
+    """Après chaque job de scraping du process : nouvelles versions et change sets lus immédiatement"""
+    data_versions.invalidate()
+    change_feed.notify()
+
+scraper_worker.add_listener(on_scrape_done)
+
+def settle_finished_matches(message):
+    """Change set d'une ligue (scraper du process ou service externe) : régler les paris des matchs terminés"""
+    # Le pilote seul règle les paris : un change set est lu par tous les workers
+    if message.get("finished") and scheduler_lease.is_leader:
+        settle_bets(message["finished"])
+
+def find_match_key(selection):
+    """Clé canonique du match visé par une sélection (celle de la carte, sinon prochaine rencontre des deux équipes)"""
+    # Clé envoyée par le client ("undefined" ou vide pour une carte sans clé) : retenue seulement si elle existe
+    key = selection.get("match_key")
+    if isinstance(key, str) and key and collection.find_one({"match_key": key}, {"_id": 1}):
+        return key
+    
+    match = collection.find_one(
+        {
+            "league_id": selection.get("league_id"),
+            "home_team": selection.get("home_team"),
+            "away_team": selection.get("away_team")
+        },
+        {"match_key": 1},
+        sort=[("is_finished", 1), ("datetime", 1)]
+    )
+    return match.get("match_key") if match else None
+
+def link_pending_bets():
+    """Renseigne match_keys sur les anciens paris en attente"""
+    operations = []
+    for bet in bets_collection.find({"status": "pending", "match_keys": {"$exists": False}}):
+        selections = bet.get("selections", [])
+        for selection in selections:
+            selection["match_key"] = find_match_key(selection)
+        keys = [selection["match_key"] for selection in selections if selection["match_key"]]
+        operations.append(UpdateOne(
+            {"_id": bet["_id"]},
+            {"$set": {"selections": selections, "match_keys": keys}}
+        ))
+    
+    if operations:
+        bets_collection.bulk_write(operations, ordered=False)
+        touch_bets()
+        print(f"[BETS] {len(operations)} pari(s) relié(s) à leurs matchs")
+
+def selection_won(bet_type, score_home, score_away):
+    if bet_type == '1':
+        return score_home > score_away
+    if bet_type == 'X':
+        return score_home == score_away
+    if bet_type == '2':
+        return score_home < score_away
+    return False
+
+@BET_SETTLEMENT.time()
+def settle_bets(match_keys):
+    """Règle les paris en attente qui portent sur les matchs donnés, en un seul bulk_write"""
     try:
-        pending_bets = list(bets_collection.find({"status": "pending"}))
+        if not match_keys:
+            return 0
         
-        for bet in pending_bets:
-            all_finished = True
-            all_won = True
-            
-            for selection in bet['selections']:
-                match = collection.find_one({
-                    "league_id": selection['league_id'],
-                    "home_team": selection['home_team'],
-                    "away_team": selection['away_team']
-                })
-                
-                if not match or not match.get('is_finished', False):
-                    all_finished = False
-                    break
-                
-                bet_type = selection['bet_type']
-                score_home = int(match.get('score_home', 0))
-                score_away = int(match.get('score_away', 0))
-                
-                won = False
-                if bet_type == '1' and score_home > score_away:
-                    won = True
-                elif bet_type == 'X' and score_home == score_away:
-                    won = True
-                elif bet_type == '2' and score_home < score_away:
-                    won = True
-                
-                if not won:
-                    all_won = False
+        bets = list(bets_collection.find(
+            {"status": "pending", "match_keys": {"$in": list(match_keys)}},
+            {"selections": 1, "match_keys": 1}
+        ))
+        if not bets:
+            return 0
+        
+        # Scores de tous les matchs des paris concernés (y compris leurs autres sélections)
+        keys = {key for bet in bets for key in bet["match_keys"]}
+        results = {
+            match["match_key"]: match
+            for match in collection.find(
+                {"match_key": {"$in": list(keys)}, "is_finished": True},
+                {"match_key": 1, "score_home": 1, "score_away": 1}
+            )
+            if match.get("score_home") is not None and match.get("score_away") is not None
+        }
+        
+        now = datetime.now()
+        operations = []
+        for bet in bets:
+            selections = bet["selections"]
+            if not all(selection.get("match_key") in results for selection in selections):
+                continue
             
-            if all_finished:
-                new_status = "won" if all_won else "lost"
-                bets_collection.update_one(
-                    {"_id": bet['_id']},
-                    {"$set": {"status": new_status, "resolved_at": datetime.now()}}
+            all_won = all(
+                selection_won(
+                    selection["bet_type"],
+                    results[selection["match_key"]]["score_home"],
+                    results[selection["match_key"]]["score_away"]
                 )
-                print(f"[BETS] Pari {bet['_id']} résolu: {new_status}")
+                for selection in selections
+            )
+            new_status = "won" if all_won else "lost"
+            # Filtre sur le statut : un pari déjà réglé n'est pas réécrit
+            operations.append(UpdateOne(
+                {"_id": bet["_id"], "status": "pending"},
+                {"$set": {"status": new_status, "resolved_at": now}}
+            ))
+            print(f"[BETS] Pari {bet['_id']} résolu: {new_status}")
+        
+        if not operations:
+            return 0
+        
+        settled = bets_collection.bulk_write(operations, ordered=False).modified_count
+        BETS_SETTLED.inc(settled)
+        if settled:
+            touch_bets()
+        return settled
         
     except Exception as e:
         print(f"[BETS] Erreur mise à jour paris: {e}")
+        return 0
+
+def settle_pending_bets():
+    """Passe complète au démarrage : paris dont les matchs se sont terminés pendant l'arrêt de l'application"""
+    link_pending_bets()
+    return settle_bets(bets_collection.distinct("match_keys", {"status": "pending"}))
+
+# Requêtes conditionnelles : ETag fort dérivé des versions de données
+BETS_VERSION_KEY = "bets"
+
+def touch_bets():
+    """Nouvelle version de la collection bets (nouveau pari ou pari réglé)"""
+    bump_data_version(db, BETS_VERSION_KEY)
+    data_versions.invalidate()
+
+def league_etag(league_id, *args, **kwargs):
+    """ETag d'une vue par ligue : endpoint + paramètres + version de la ligue"""
+    if league_id not in LEAGUES:
+        return None
+    return make_etag(request.endpoint, league_id, request.query_string, data_versions.get(league_id))
+
+def bets_etag(*args, **kwargs):
+    return make_etag(request.endpoint, data_versions.get(BETS_VERSION_KEY))
+
+def conditional(etag_for):
+    """Renvoie 304 sans exécuter la vue quand le client possède déjà la version courante"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_for(*args, **kwargs)
+            if etag is None:
+                return view(*args, **kwargs)
+            
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            # Le navigateur revalide à chaque poll (If-None-Match) au lieu de relire le corps
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Latence et taille par modèle de route (cardinalité bornée)"""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_DURATION.observe(time.perf_counter() - g.request_started,
+                             route=route, method=request.method, status=response.status_code)
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route=route)
+    return response
+
+@app.template_filter("odd")
+def format_odd(value):
+    """Affichage d'une cote numérique ('-' si non proposée)"""
+    return f"{value:.2f}" if isinstance(value, (int, float)) else "-"
+
+@app.template_filter("score")
+def format_score(value):
+    """Affichage d'un score ('-' s'il n'est pas connu)"""
+    return value if value is not None else "-"
+
+def sorted_league_matches(league_id):
+    """Matchs d'une ligue triés (live, à venir, terminés), mis en cache par version de données"""
+    def build():
+        matches = list(collection.find({"league_id": league_id}))
+        matches.sort(key=lambda x: (
+            not x.get("is_live", False),
+            x.get("is_finished", False),
+            x.get("datetime", datetime.max)
+        ))
+        return matches
+    
+    return response_cache.get_or_build(("home", league_id), data_versions.get(league_id), build)
 
 @app.route("/")
 @app.route("/<league_id>")
@@ -190,12 +449,7 @@ def home(league_id="ligue-1"):
         if league_id not in LEAGUES:
             league_id = "ligue-1"
         
-        matches = list(collection.find({"league_id": league_id}))
-        matches.sort(key=lambda x: (
-            not x.get("is_live", False),
-            x.get("is_finished", False),
-            x.get("datetime", datetime.max)
-        ))
+        matches = sorted_league_matches(league_id)
         
         league_info = LEAGUES[league_id]
         
@@ -210,7 +464,7 @@ def home(league_id="ligue-1"):
         current_league=league_id,
         league_info=league_info,
         all_leagues=LEAGUES,
-        initial_scraping_done=initial_scraping_done
+        initial_scraping_done=shared_status.get()["initial_scraping_done"]
     )
 
 @app.route("/explore")
@@ -267,45 +521,68 @@ def my_bets():
         print(f"ERREUR AFFICHAGE PARIS : {e}")
         return f"Erreur interne : {e}", 500
 
+def build_matches_payload(league_id):
+    """Corps JSON sérialisé de /api/matches pour une ligue"""
+    matches = list(collection.find({"league_id": league_id}))
+    # Date de la dernière écriture effective du scraper sur la ligue
+    return app.json.dumps(matches_payload(league_id, matches, data_versions.updated_at(league_id)))
+
 @app.route("/api/matches/<league_id>")
+@conditional(league_etag)
 def get_matches(league_id):
     """API pour récupérer les matchs en JSON (sans recharger la page)"""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
         
-        matches = list(collection.find({"league_id": league_id}))
-        matches.sort(key=lambda x: (not x.get("is_live", False), x.get("datetime", datetime.max)))
-        
-        for match in matches:
-            match['_id'] = str(match['_id'])
-            if 'datetime' in match:
-                match['datetime'] = match['datetime'].isoformat()
-            if 'scraped_at' in match:
-                match['scraped_at'] = match['scraped_at'].isoformat()
-        
-        total = len(matches)
-        live = len([m for m in matches if m.get('is_live', False)])
-        finished = len([m for m in matches if m.get('is_finished', False)])
-        upcoming = total - live - finished
-
-        return jsonify({
-            "status": "success",
-            "league_id": league_id,
-            "league_name": LEAGUES[league_id]['name'],
-            "stats": {
-                "total": total,
-                "live": live,
-                "upcoming": upcoming,
-                "finished": finished
-            },
-            "matches": matches,
-            "updated_at": datetime.now().isoformat()
-        })
+        # Une lecture MongoDB par écriture du scraper, quel que soit le nombre de clients
+        body = response_cache.get_or_build(
+            ("matches", league_id),
+            data_versions.get(league_id),
+            lambda: build_matches_payload(league_id)
+        )
+        return app.response_class(body, mimetype="application/json")
                 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/stream/<league_id>")
+def stream_league(league_id):
+    """Flux SSE : diffs par match (cotes, score, passage en live / terminé) dès l'écriture du scraper"""
+    if league_id not in LEAGUES:
+        return jsonify({"error": "Ligue inconnue"}), 400
+    
+    if not stream_slots.acquire(blocking=False):
+        response = jsonify({"error": "Trop de flux ouverts, utiliser /api/matches"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    
+    subscription = change_feed.subscribe(league_id)
+    
+    def events():
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                message = subscription.get(timeout=15)
+            except queue.Empty:
+                # Commentaire SSE : garde la connexion ouverte derrière les proxys
+                yield ": ping\n\n"
+                continue
+            yield f"event: changes\ndata: {app.json.dumps(message)}\n\n"
+    
+    def close():
+        # Appelé par le serveur à la fermeture de la réponse, même si le générateur n'a jamais démarré
+        change_feed.unsubscribe(league_id, subscription)
+        stream_slots.release()
+    
+    response = app.response_class(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(close)
+    return response
+
 @app.route("/api/place-bet", methods=["POST"])
 def place_bet():
     try:
@@ -321,9 +598,15 @@ def place_bet():
         total_odd = 1.0
         for s in selections:
             total_odd *= float(s['odd'])
+            # Le pari est rattaché au match exact (pas seulement aux deux équipes)
+            s['match_key'] = find_match_key(s)
+            if not s['match_key']:
+                # Sans match connu, le pari ne pourrait jamais être réglé
+                return jsonify({"error": f"Match introuvable : {s.get('home_team')} - {s.get('away_team')}"}), 400
 
         bet = {
             "selections": selections,
+            "match_keys": [s['match_key'] for s in selections],
             "stake": stake,
             "total_odd": round(total_odd, 2),
             "potential_win": round(stake * total_odd, 2),
@@ -334,6 +617,7 @@ def place_bet():
 
         result = bets_collection.insert_one(bet)
         print(f"PARI INSÉRÉ AVEC ID : {result.inserted_id}")
+        touch_bets()
         
         return jsonify({"status": "success", "bet_id": str(result.inserted_id)})
     except Exception as e:
@@ -341,6 +625,7 @@ def place_bet():
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/my-bets")
+@conditional(bets_etag)
 def get_my_bets():
     """API pour récupérer tous les paris"""
     try:
@@ -362,29 +647,20 @@ def get_my_bets():
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/teams/<league_id>")
+@conditional(league_etag)
 def get_teams(league_id):
     """API pour récupérer la liste des équipes d'une ligue."""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        teams = set()
-        for match in matches:
-            if match.get("home_team"):
-                teams.add(match["home_team"])
-            if match.get("away_team"):
-                teams.add(match["away_team"])
-
-        return jsonify({
-            "status": "success",
-            "league_id": league_id,
-            "teams": sorted(teams)
-        })
+        matches = collection.find({"league_id": league_id}, TEAMS_PROJECTION)
+        return jsonify(teams_payload(league_id, matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/team-matches/<league_id>")
+@conditional(league_etag)
 def get_team_matches(league_id):
     """API pour récupérer les matchs d'une équipe."""
     try:
@@ -395,27 +671,8 @@ def get_team_matches(league_id):
         if not team:
             return jsonify({"error": "Paramètre 'team' manquant"}), 400
 
-        matches = list(collection.find({
-            "league_id": league_id,
-            "$or": [{"home_team": team}, {"away_team": team}]
-        }))
-
-        matches.sort(key=lambda x: (not x.get("is_live", False), x.get("datetime", datetime.max)))
-
-        for match in matches:
-            match["_id"] = str(match["_id"])
-            if "datetime" in match:
-                match["datetime"] = match["datetime"].isoformat()
-            if "scraped_at" in match:
-                match["scraped_at"] = match["scraped_at"].isoformat()
-
-        return jsonify({
-            "status": "success",
-            "league_id": league_id,
-            "team": team,
-            "count": len(matches),
-            "matches": matches
-        })
+        matches = list(collection.find(team_matches_filter(league_id, team)))
+        return jsonify(team_matches_payload(league_id, team, matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -426,27 +683,15 @@ def refresh_league(league_id):
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
         
-        def run_scraper():
-            try:
-                print(f"[Scraping] Démarrage {LEAGUES[league_id]['name']}...", flush=True)
-                result = subprocess.run(
-                    ["python", "scraper/scraper_mongo.py", league_id],
-                    timeout=120
-                )
-                if result.returncode != 0:
-                    print(f"[Scraping] Erreur (code {result.returncode})", flush=True)
-                else:
-                    print(f"[Scraping] {LEAGUES[league_id]['name']} terminé", flush=True)
-            except Exception as e:
-                print(f"[Scraping] Erreur: {e}")
-        
-        thread = threading.Thread(target=run_scraper, daemon=True)
-        thread.start()
+        # Les clics répétés partagent le même job tant qu'il n'est pas terminé
+        job = request_scrape(league_id)
+        print(f"[Scraping] {LEAGUES[league_id]['name']}: job {job['key']} ({job['state']})", flush=True)
         
         return jsonify({
             "status": "success", 
             "message": "Scraping démarré",
-            "league": LEAGUES[league_id]['name']
+            "league": LEAGUES[league_id]['name'],
+            "job": job
         })
         
     except Exception as e:
@@ -456,28 +701,12 @@ def refresh_league(league_id):
 def refresh_all():
     """API pour scraper TOUTES les ligues"""
     try:
-        def run_scraper():
-            global scraping_in_progress
-            scraping_in_progress = True
-            try:
-                subprocess.run(
-                    ["python", "scraper/scraper_mongo.py"],
-                    timeout=300,
-                    capture_output=True
-                )
-                print("[Scraping] Toutes les ligues terminées")
-                update_bets_results()
-            except Exception as e:
-                print(f"[Scraping] Erreur: {e}")
-            finally:
-                scraping_in_progress = False
-        
-        thread = threading.Thread(target=run_scraper, daemon=True)
-        thread.start()
+        job = request_scrape()
         
         return jsonify({
             "status": "success",
-            "message": "Scraping de toutes les ligues démarré"
+            "message": "Scraping de toutes les ligues démarré",
+            "job": job
         })
         
     except Exception as e:
@@ -504,209 +733,99 @@ def graphics(league_id="ligue-1"):
     )
 
 @app.route("/api/stats/<league_id>")
+@conditional(league_etag)
 def get_stats(league_id):
     """API pour récupérer les statistiques d'une ligue"""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        
-        # Statistiques par équipe
-        team_stats = {}
-        
-        for match in matches:
-            home_team = match.get('home_team')
-            away_team = match.get('away_team')
-            
-            # Initialiser les équipes
-            if home_team and home_team not in team_stats:
-                team_stats[home_team] = {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0}
-            if away_team and away_team not in team_stats:
-                team_stats[away_team] = {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0}
-            
-            # Compter seulement les matchs terminés
-            if match.get('is_finished'):
-                score_home = int(match.get('score_home', 0))
-                score_away = int(match.get('score_away', 0))
-                
-                if home_team:
-                    team_stats[home_team]['played'] += 1
-                    if score_home > score_away:
-                        team_stats[home_team]['wins'] += 1
-                    elif score_home == score_away:
-                        team_stats[home_team]['draws'] += 1
-                    else:
-                        team_stats[home_team]['losses'] += 1
-                
-                if away_team:
-                    team_stats[away_team]['played'] += 1
-                    if score_away > score_home:
-                        team_stats[away_team]['wins'] += 1
-                    elif score_away == score_home:
-                        team_stats[away_team]['draws'] += 1
-                    else:
-                        team_stats[away_team]['losses'] += 1
-        
-        # Stats générales
-        total_matches = len(matches)
-        finished = len([m for m in matches if m.get('is_finished')])
-        live = len([m for m in matches if m.get('is_live')])
-        
-        # Récupérer les cotes (avec les bons noms de champs)
-        odds_1 = []
-        odds_x = []
-        odds_2 = []
-        
-        for m in matches:
-            try:
-                if m.get('odd_1'):
-                    odds_1.append(float(m.get('odd_1')))
-                if m.get('odd_x'):
-                    odds_x.append(float(m.get('odd_x')))
-                if m.get('odd_2'):
-                    odds_2.append(float(m.get('odd_2')))
-            except:
-                pass
-        
-        return jsonify({
-            "status": "success",
-            "league_id": league_id,
-            "league_name": LEAGUES[league_id]['name'],
-            "summary": {
-                "total_matches": total_matches,
-                "finished": finished,
-                "live": live,
-                "upcoming": total_matches - finished - live
-            },
-            "team_stats": team_stats,
-            "odds": {
-                "avg_1": round(sum(odds_1) / len(odds_1), 2) if odds_1 else 0,
-                "avg_x": round(sum(odds_x) / len(odds_x), 2) if odds_x else 0,
-                "avg_2": round(sum(odds_2) / len(odds_2), 2) if odds_2 else 0,
-                "min_1": min(odds_1) if odds_1 else 0,
-                "max_1": max(odds_1) if odds_1 else 0,
-                "samples": len(odds_1)
-            }
-        })
+        result = next(collection.aggregate(stats_pipeline(league_id)))
+        return jsonify(stats_payload(league_id, result))
     except Exception as e:
         print(f"Error in get_stats: {e}")
         return jsonify({"error": str(e)}), 500
-        
-        return jsonify({
-            "status": "success",
-            "league_id": league_id,
-            "league_name": LEAGUES[league_id]['name'],
-            "summary": {
-                "total_matches": total_matches,
-                "finished": finished,
-                "live": live,
-                "upcoming": total_matches - finished - live
-            },
-            "team_stats": team_stats,
-            "odds": {
-                "avg_odds_1": round(sum(odds_1) / len(odds_1), 2) if odds_1 else 0,
-                "avg_odds_x": round(sum(odds_x) / len(odds_x), 2) if odds_x else 0,
-                "avg_odds_2": round(sum(odds_2) / len(odds_2), 2) if odds_2 else 0
-            }
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
 
 @app.route("/api/odds-distribution/<league_id>")
+@conditional(league_etag)
 def get_odds_distribution(league_id):
-    """API pour récupérer la distribution des cotes"""
+    """API pour récupérer la distribution des cotes (nombre de cotes par tranche, taille bornée)"""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        
-        odds_1 = []
-        odds_x = []
-        odds_2 = []
-        
-        for m in matches:
-            try:
-                if m.get('odd_1'):
-                    odds_1.append(float(m.get('odd_1')))
-                if m.get('odd_x'):
-                    odds_x.append(float(m.get('odd_x')))
-                if m.get('odd_2'):
-                    odds_2.append(float(m.get('odd_2')))
-            except:
-                pass
+        result = next(collection.aggregate([
+            {"$match": {"league_id": league_id}},
+            {"$project": {"_id": 0, **{field: odd_expr(field) for field in ("odd_1", "odd_x", "odd_2")}}},
+            {"$facet": {
+                "odds_1": odds_histogram("odd_1"),
+                "odds_x": odds_histogram("odd_x"),
+                "odds_2": odds_histogram("odd_2")
+            }}
+        ]), {})
         
         return jsonify({
             "status": "success",
-            "odds_1": odds_1,
-            "odds_x": odds_x,
-            "odds_2": odds_2
+            "boundaries": ODDS_BUCKETS,
+            "odds_1": histogram_payload(result.get("odds_1", [])),
+            "odds_x": histogram_payload(result.get("odds_x", [])),
+            "odds_2": histogram_payload(result.get("odds_2", []))
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/odds-extremes/<league_id>")
+@conditional(league_etag)
 def get_odds_extremes(league_id):
     """API pour récupérer les 5 plus hautes et 5 plus basses cotes"""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        
-        all_odds = []
-        
-        for m in matches:
-            # Ajouter chaque cote avec le contexte du match
-            try:
-                if m.get('odd_1'):
-                    all_odds.append({
-                        'value': float(m.get('odd_1')),
-                        'type': 'Domicile',
-                        'home': m.get('home_team'),
-                        'away': m.get('away_team'),
-                        'date': m.get('date', '')
-                    })
-            except:
-                pass
-            try:
-                if m.get('odd_x'):
-                    all_odds.append({
-                        'value': float(m.get('odd_x')),
-                        'type': 'Nul',
-                        'home': m.get('home_team'),
-                        'away': m.get('away_team'),
-                        'date': m.get('date', '')
-                    })
-            except:
-                pass
-            try:
-                if m.get('odd_2'):
-                    all_odds.append({
-                        'value': float(m.get('odd_2')),
-                        'type': 'Extérieur',
-                        'home': m.get('home_team'),
-                        'away': m.get('away_team'),
-                        'date': m.get('date', '')
-                    })
-            except:
-                pass
-        
-        # Trier et récupérer les extrêmes
-        sorted_low = sorted(all_odds, key=lambda x: x['value'])[:5]
-        sorted_high = sorted(all_odds, key=lambda x: x['value'], reverse=True)[:5]
+        result = next(collection.aggregate([
+            {"$match": {"league_id": league_id}},
+            *odds_unwind_stages(),
+            {"$facet": {
+                "lowest": [{"$sort": {"value": 1}}, {"$limit": 5}],
+                "highest": [{"$sort": {"value": -1}}, {"$limit": 5}],
+                "count": [{"$count": "total"}]
+            }}
+        ]))
         
         return jsonify({
             "status": "success",
-            "lowest": sorted_low,
-            "highest": sorted_high,
-            "total_odds": len(all_odds)
+            "lowest": result["lowest"],
+            "highest": result["highest"],
+            "total_odds": result["count"][0]["total"] if result["count"] else 0
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/opportunities")
+def get_opportunities():
+    """API pour récupérer les meilleures cotes de toutes les ligues, classées par edge"""
+    try:
+        league_id = request.args.get("league")
+        if league_id and league_id not in LEAGUES:
+            return jsonify({"error": "Ligue inconnue"}), 400
+
+        kind = request.args.get("kind")
+        if kind and kind not in ("arbitrage", "value"):
+            return jsonify({"error": "Paramètre 'kind' invalide (arbitrage ou value)"}), 400
+
+        min_edge = request.args.get("min_edge", type=float)
+        limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+
+        return jsonify({
+            "status": "success",
+            **opportunity_book.summary(),
+            "opportunities": opportunity_book.opportunities(league_id, kind, min_edge, limit)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/team-odds/<league_id>")
+@conditional(league_etag)
 def get_team_odds(league_id):
     """API pour récupérer toutes les cotes d'une équipe et la moyenne de la ligue"""
     try:
@@ -717,159 +836,193 @@ def get_team_odds(league_id):
         if not team:
             return jsonify({"error": "Paramètre 'team' manquant"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        
-        # Récupérer les cotes de l'équipe
-        team_odds = []
-        for m in matches:
-            is_home = m.get('home_team') == team
-            is_away = m.get('away_team') == team
-            
-            if is_home:
-                try:
-                    if m.get('odd_1'):
-                        team_odds.append({
-                            'value': float(m.get('odd_1')),
-                            'type': 'Domicile',
-                            'vs': m.get('away_team'),
-                            'date': m.get('date', '')
-                        })
-                except:
-                    pass
-            elif is_away:
-                try:
-                    if m.get('odd_2'):
-                        team_odds.append({
-                            'value': float(m.get('odd_2')),
-                            'type': 'Extérieur',
-                            'vs': m.get('home_team'),
-                            'date': m.get('date', '')
-                        })
-                except:
-                    pass
-        
-        # Calculer les moyennes de la ligue
-        all_odds_1 = []
-        all_odds_x = []
-        all_odds_2 = []
-        for m in matches:
-            try:
-                if m.get('odd_1'):
-                    all_odds_1.append(float(m.get('odd_1')))
-                if m.get('odd_x'):
-                    all_odds_x.append(float(m.get('odd_x')))
-                if m.get('odd_2'):
-                    all_odds_2.append(float(m.get('odd_2')))
-            except:
-                pass
-        
+        is_home = {"$eq": ["$home_team", team]}
+        result = next(collection.aggregate([
+            {"$match": {"league_id": league_id}},
+            {"$facet": {
+                # Cote de victoire de l'équipe : 1 à domicile, 2 à l'extérieur
+                "team_odds": [
+                    {"$match": {"$or": [{"home_team": team}, {"away_team": team}]}},
+                    {"$project": {
+                        "_id": 0,
+                        "value": {"$cond": [is_home, odd_expr("odd_1"), odd_expr("odd_2")]},
+                        "type": {"$cond": [is_home, "Domicile", "Extérieur"]},
+                        "vs": {"$cond": [is_home, "$away_team", "$home_team"]},
+                        "date": {"$ifNull": ["$date", ""]}
+                    }},
+                    {"$match": {"value": {"$ne": None}}}
+                ],
+                # Moyennes de la ligue
+                "league_avg": [{"$group": {
+                    "_id": None,
+                    "domicile": {"$avg": odd_expr("odd_1")},
+                    "nul": {"$avg": odd_expr("odd_x")},
+                    "exterieur": {"$avg": odd_expr("odd_2")}
+                }}]
+            }}
+        ]))
+
+        averages = result["league_avg"][0] if result["league_avg"] else {}
         league_avg = {
-            'domicile': round(sum(all_odds_1) / len(all_odds_1), 2) if all_odds_1 else 0,
-            'nul': round(sum(all_odds_x) / len(all_odds_x), 2) if all_odds_x else 0,
-            'exterieur': round(sum(all_odds_2) / len(all_odds_2), 2) if all_odds_2 else 0
+            'domicile': rounded(averages.get("domicile")),
+            'nul': rounded(averages.get("nul")),
+            'exterieur': rounded(averages.get("exterieur"))
         }
         
         return jsonify({
             "status": "success",
             "team": team,
-            "team_odds": team_odds,
+            "team_odds": result["team_odds"],
             "league_avg": league_avg
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/all-odds/<league_id>")
+@conditional(league_etag)
 def get_all_odds(league_id):
-    """API pour récupérer toutes les cotes de la ligue avec détails des matchs"""
+    """API pour récupérer les cotes de la ligue avec détails des matchs (au plus `limit`) et leur distribution"""
     try:
         if league_id not in LEAGUES:
             return jsonify({"error": "Ligue inconnue"}), 400
 
-        matches = list(collection.find({"league_id": league_id}))
-        
-        all_odds = []
-        odds_with_details = []
-        
-        for m in matches:
-            try:
-                home = m.get('home_team', 'N/A')
-                away = m.get('away_team', 'N/A')
-                date = m.get('date', 'N/A')
-                
-                if m.get('odd_1'):
-                    odd_val = float(m.get('odd_1'))
-                    all_odds.append(odd_val)
-                    odds_with_details.append({
-                        "value": odd_val,
-                        "home": home,
-                        "away": away,
-                        "type": "Domicile",
-                        "date": date,
-                        "match": f"{home} vs {away}"
-                    })
-                
-                if m.get('odd_x'):
-                    odd_val = float(m.get('odd_x'))
-                    all_odds.append(odd_val)
-                    odds_with_details.append({
-                        "value": odd_val,
-                        "home": home,
-                        "away": away,
-                        "type": "Nul",
-                        "date": date,
-                        "match": f"{home} vs {away}"
-                    })
-                
-                if m.get('odd_2'):
-                    odd_val = float(m.get('odd_2'))
-                    all_odds.append(odd_val)
-                    odds_with_details.append({
-                        "value": odd_val,
-                        "home": home,
-                        "away": away,
-                        "type": "Extérieur",
-                        "date": date,
-                        "match": f"{home} vs {away}"
-                    })
-            except:
-                pass
-        
-        all_odds_sorted = sorted(all_odds)
+        limit = min(max(request.args.get("limit", ALL_ODDS_LIMIT, type=int), 1), 1000)
+        result = next(collection.aggregate([
+            {"$match": {"league_id": league_id}},
+            # Ordre stable avant $limit : mêmes matchs renvoyés pour un même ETag (coups d'envoi les plus proches)
+            {"$sort": {"datetime": 1, "match_key": 1}},
+            *odds_unwind_stages(),
+            {"$facet": {
+                "details": [{"$limit": limit}, {"$project": {
+                    "value": 1,
+                    "type": 1,
+                    "date": {"$ifNull": ["$date", "N/A"]},
+                    "home": {"$ifNull": ["$home", "N/A"]},
+                    "away": {"$ifNull": ["$away", "N/A"]},
+                    "match": {"$concat": [{"$ifNull": ["$home", "N/A"]}, " vs ", {"$ifNull": ["$away", "N/A"]}]}
+                }}],
+                "distribution": odds_histogram("value"),
+                "summary": [{"$group": {
+                    "_id": None,
+                    "min": {"$min": "$value"},
+                    "max": {"$max": "$value"},
+                    "avg": {"$avg": "$value"},
+                    "count": {"$sum": 1}
+                }}]
+            }}
+        ]))
+
+        summary = result["summary"][0] if result["summary"] else {}
         
         return jsonify({
             "status": "success",
-            "all_odds": all_odds_sorted,
-            "odds_with_details": odds_with_details,
-            "min": min(all_odds) if all_odds else 0,
-            "max": max(all_odds) if all_odds else 0,
-            "avg": round(sum(all_odds) / len(all_odds), 2) if all_odds else 0,
-            "count": len(all_odds)
+            # Valeurs des cotes détaillées renvoyées, triées (la ligue entière est résumée par distribution)
+            "all_odds": sorted(odd["value"] for odd in result["details"]),
+            "odds_with_details": result["details"],
+            "truncated": summary.get("count", 0) > len(result["details"]),
+            "distribution": histogram_payload(result["distribution"]),
+            "boundaries": ODDS_BUCKETS,
+            "min": summary.get("min", 0),
+            "max": summary.get("max", 0),
+            "avg": rounded(summary.get("avg")),
+            "count": summary.get("count", 0)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/odds-history/<match_key>")
+def get_odds_history(match_key):
+    """API pour récupérer l'évolution des cotes d'un match, sous-échantillonnée"""
+    try:
+        # Résolution en secondes : un point (la dernière cote observée) par intervalle
+        resolution = request.args.get("resolution", 60, type=int)
+        if not resolution or resolution < 1:
+            return jsonify({"error": "Paramètre 'resolution' invalide"}), 400
+
+        match_filter = {"meta.match_key": match_key}
+        bookmaker = request.args.get("bookmaker", "").strip()
+        if bookmaker:
+            match_filter["meta.bookmaker"] = bookmaker
+
+        buckets = odds_history_collection.aggregate([
+            {"$match": match_filter},
+            {"$sort": {"ts": 1}},
+            {"$group": {
+                "_id": {
+                    "bookmaker": "$meta.bookmaker",
+                    "bucket": {"$dateTrunc": {"date": "$ts", "unit": "second", "binSize": resolution}}
+                },
+                "ts": {"$last": "$ts"},
+                "odd_1": {"$last": "$odd_1"},
+                "odd_x": {"$last": "$odd_x"},
+                "odd_2": {"$last": "$odd_2"}
+            }},
+            {"$sort": {"_id.bucket": 1}}
+        ])
+
+        series = {}
+        for point in buckets:
+            series.setdefault(point["_id"]["bookmaker"], []).append({
+                "ts": point["ts"].isoformat(),
+                "odd_1": point["odd_1"],
+                "odd_x": point["odd_x"],
+                "odd_2": point["odd_2"]
+            })
+
+        return jsonify({
+            "status": "success",
+            "match_key": match_key,
+            "resolution": resolution,
+            "series": series
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/match-details/<match_key>")
+def get_match_details(match_key):
+    """API pour récupérer les cotes par bookmaker d'un match (meilleures cotes et marges par marché)"""
+    try:
+        detail = match_details_collection.find_one({"_id": match_key}, {"_id": 0})
+        if detail is None:
+            return jsonify({"error": "Détail non disponible pour ce match"}), 404
+
+        detail["fetched_at"] = detail["fetched_at"].isoformat()
+        return jsonify({"status": "success", **detail})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def status_state():
+    """Partie du statut commune à tous les workers (document partagé, relu au plus une fois par seconde)"""
+    return status_payload(shared_status.get())
+
+def status_etag():
+    return make_etag(status_state(), data_versions.all())
+
 @app.route("/api/status")
+@conditional(status_etag)
 def get_status():
     """API pour vérifier le statut du scraping"""
-    return jsonify({
-        "initial_scraping_done": initial_scraping_done,
-        "scraping_in_progress": scraping_in_progress,
+    # Les compteurs ne sont recalculés que lorsqu'une version de données change
+    versions = data_versions.all()
+    totals = response_cache.get_or_build(("status-totals",), tuple(sorted(versions.items())), lambda: {
         "total_matches": collection.count_documents({}),
-        "total_bets": bets_collection.count_documents({}),
-        "scraping_status": scraping_status
+        "total_bets": bets_collection.count_documents({})
     })
+    return jsonify({**status_state(), **totals})
+
+@app.route("/metrics")
+def metrics():
+    """Métriques au format texte Prometheus (tous les workers et le scraper)"""
+    flush(metrics_collection)
+    return app.response_class(export(metrics_collection), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    # Scraping initial au démarrage
-    initial_thread = threading.Thread(target=initial_scrape, daemon=True)
-    initial_thread.start()
-    
-    # Scraping automatique
-    start_background_scraping()
+    # Mode développement (un seul process) ; en production : gunicorn -c gunicorn.conf.py app:app
+    start_background_services()
     
     # Démarrer Flask
     print("FOC - First On Cotes")
     print("Scraping initial en cours...")
-    print("Auto-refresh: toutes les 3 minutes")
+    print("Auto-refresh: adaptatif (direct ~45s, ligues inactives jusqu'à 30 min)")
     print("⚡ Actualisation rapide: toutes les 10 secondes")
-    app.run(host="0.0.0.0", port=8000, debug=True, use_reloader=False)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=8000, debug=True, use_reloader=False)
@@ -0,0 +1,27 @@
+import os
+
+from a2wsgi import WSGIMiddleware
+
+import async_api
+from app import app as flask_app, start_background_services, change_feed
+from async_api import api, handles
+
+# Point d'entrée ASGI : l'API JSON en lecture et les flux SSE sont servis en async (async_api),
+# tout le reste (pages, paris, scraping à la demande) par l'application Flask existante
+WSGI_THREADS = int(os.getenv("WEB_THREADS", "16"))
+
+flask_asgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+# Un seul suivi de match_changes par process, pour les flux async comme pour Flask
+async_api.change_feed = change_feed
+
+@api.before_serving
+async def start_services():
+    # Scraping piloté par un seul worker (bail MongoDB), comme en mode WSGI
+    start_background_services()
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan" or (scope["type"] == "http" and handles(scope["path"])):
+        await api(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import re
+import sys
+import time
+from functools import wraps
+
+from pymongo import AsyncMongoClient
+from quart import Quart, request, jsonify, g
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+from db_setup import DATA_VERSIONS_COLLECTION
+from metrics import REQUEST_DURATION, RESPONSE_SIZE
+from cache import AsyncDataVersions, ResponseCache
+from coordination import APP_STATE_COLLECTION, STATUS_KEY, status_defaults
+from payloads import (LEAGUES, make_etag, matches_payload, TEAMS_PROJECTION, teams_payload,
+                      team_matches_filter, team_matches_payload, stats_pipeline, stats_payload, status_payload)
+
+# API JSON en lecture servie en async : une coroutine par client en attente de MongoDB,
+# mêmes routes, mêmes corps et mêmes ETag que les vues Flask
+api = Quart(__name__)
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017/odds_db")
+
+# Routes servies par cette application (le reste est confié à Flask par asgi.py)
+ASYNC_ROUTES = [
+    re.compile(r"^/api/matches/[^/]+$"),
+    re.compile(r"^/api/teams/[^/]+$"),
+    re.compile(r"^/api/team-matches/[^/]+$"),
+    re.compile(r"^/api/stats/[^/]+$"),
+    re.compile(r"^/api/status$"),
+    re.compile(r"^/api/stream/[^/]+$"),
+]
+
+def handles(path):
+    return any(route.match(path) for route in ASYNC_ROUTES)
+
+# Créés au démarrage de la boucle d'événements (le client async y est rattaché)
+client = None
+db = None
+collection = None
+data_versions = None
+response_cache = ResponseCache()
+# Suivi des change sets partagé avec les vues Flask du process (branché par asgi.py)
+change_feed = None
+_status = {"value": status_defaults(len(LEAGUES)), "loaded_at": 0.0}
+
+@api.before_serving
+async def connect():
+    global client, db, collection, data_versions
+    client = AsyncMongoClient(MONGO_URI)
+    db = client["odds_db"]
+    collection = db["matches"]
+    data_versions = AsyncDataVersions(db[DATA_VERSIONS_COLLECTION])
+
+@api.after_serving
+async def disconnect():
+    await client.close()
+
+@api.before_request
+async def start_timer():
+    g.request_started = time.perf_counter()
+
+@api.after_request
+async def record_request(response):
+    # Mêmes séries que les vues Flask (envoyées par le thread de métriques du process)
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_DURATION.observe(time.perf_counter() - g.request_started,
+                             route=route, method=request.method, status=response.status_code)
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route=route)
+    return response
+
+async def shared_status():
+    """Document de statut partagé (écrit par le worker pilote), relu au plus une fois par seconde"""
+    if time.monotonic() - _status["loaded_at"] >= 1.0:
+        doc = await db[APP_STATE_COLLECTION].find_one({"_id": STATUS_KEY}) or {}
+        doc.pop("_id", None)
+        _status["value"] = {**status_defaults(len(LEAGUES)), **doc}
+        _status["loaded_at"] = time.monotonic()
+    return _status["value"]
+
+async def league_etag(league_id):
+    # Nom d'endpoint identique à la vue Flask : même ETag quel que soit le chemin qui répond
+    if league_id not in LEAGUES:
+        return None
+    return make_etag(request.endpoint, league_id, request.query_string, await data_versions.get(league_id))
+
+async def status_etag():
+    return make_etag(status_payload(await shared_status()), await data_versions.all())
+
+def conditional(etag_for):
+    """Renvoie 304 sans exécuter la vue quand le client possède déjà la version courante"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            etag = await etag_for(*args, **kwargs)
+            if etag is None:
+                return await view(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                response = api.response_class("", status=304)
+            else:
+                response = await api.make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
+
+@api.route("/api/matches/<league_id>", endpoint="get_matches")
+@conditional(league_etag)
+async def get_matches(league_id):
+    try:
+        if league_id not in LEAGUES:
+            return jsonify({"error": "Ligue inconnue"}), 400
+
+        async def build():
+            matches = await collection.find({"league_id": league_id}).to_list()
+            return api.json.dumps(matches_payload(league_id, matches, await data_versions.updated_at(league_id)))
+
+        body = await response_cache.get_or_build_async(("matches", league_id), await data_versions.get(league_id), build)
+        return api.response_class(body, mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/teams/<league_id>", endpoint="get_teams")
+@conditional(league_etag)
+async def get_teams(league_id):
+    try:
+        if league_id not in LEAGUES:
+            return jsonify({"error": "Ligue inconnue"}), 400
+
+        matches = await collection.find({"league_id": league_id}, TEAMS_PROJECTION).to_list()
+        return jsonify(teams_payload(league_id, matches))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/team-matches/<league_id>", endpoint="get_team_matches")
+@conditional(league_etag)
+async def get_team_matches(league_id):
+    try:
+        if league_id not in LEAGUES:
+            return jsonify({"error": "Ligue inconnue"}), 400
+
+        team = request.args.get("team", "").strip()
+        if not team:
+            return jsonify({"error": "Paramètre 'team' manquant"}), 400
+
+        matches = await collection.find(team_matches_filter(league_id, team)).to_list()
+        return jsonify(team_matches_payload(league_id, team, matches))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/stats/<league_id>", endpoint="get_stats")
+@conditional(league_etag)
+async def get_stats(league_id):
+    try:
+        if league_id not in LEAGUES:
+            return jsonify({"error": "Ligue inconnue"}), 400
+
+        cursor = await collection.aggregate(stats_pipeline(league_id))
+        result = await cursor.next()
+        return jsonify(stats_payload(league_id, result))
+    except Exception as e:
+        print(f"Error in get_stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/stream/<league_id>", endpoint="stream_league")
+async def stream_league(league_id):
+    """Flux SSE servi par une coroutine : un onglet ouvert n'immobilise aucun thread Flask"""
+    if league_id not in LEAGUES:
+        return jsonify({"error": "Ligue inconnue"}), 400
+
+    subscription = change_feed.subscribe_async(league_id)
+
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                try:
+                    message = await subscription.get(timeout=15)
+                except asyncio.TimeoutError:
+                    # Commentaire SSE : garde la connexion ouverte derrière les proxys
+                    yield b": ping\n\n"
+                    continue
+                yield f"event: changes\ndata: {api.json.dumps(message)}\n\n".encode("utf-8")
+        finally:
+            change_feed.unsubscribe(league_id, subscription)
+
+    response = await api.make_response((events(), {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    }))
+    # Connexion longue : pas de délai maximum de réponse
+    response.timeout = None
+    return response
+
+@api.route("/api/status", endpoint="get_status")
+@conditional(status_etag)
+async def get_status():
+    versions = await data_versions.all()
+
+    async def build():
+        return {
+            "total_matches": await collection.count_documents({}),
+            "total_bets": await db["bets"].count_documents({})
+        }
+
+    totals = await response_cache.get_or_build_async(("status-totals",), tuple(sorted(versions.items())), build)
+    return jsonify({**status_payload(await shared_status()), **totals})
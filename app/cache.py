@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+class DataVersions:
+    """Versions de données par ligue (collection data_versions), relues au plus une fois par intervalle"""
+
+    def __init__(self, collection, ttl=1.0):
+        self.collection = collection
+        self.ttl = ttl
+        self._versions = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if now - self._loaded_at < self.ttl:
+                return
+            # Une seule petite requête pour toutes les ligues
+            self._versions = {
+                doc["_id"]: (doc.get("version", 0), doc.get("updated_at"))
+                for doc in self.collection.find({}, {"version": 1, "updated_at": 1})
+            }
+            self._loaded_at = time.monotonic()
+
+    def get(self, key):
+        """Version courante d'une ligue (0 si elle n'a jamais été écrite)"""
+        self._refresh()
+        return self._versions.get(key, (0, None))[0]
+
+    def updated_at(self, key):
+        """Date de la dernière écriture effective sur une ligue"""
+        self._refresh()
+        return self._versions.get(key, (0, None))[1]
+
+    def all(self):
+        """Toutes les versions connues {clé: version}"""
+        self._refresh()
+        return {key: value[0] for key, value in self._versions.items()}
+
+    def invalidate(self):
+        """Force une relecture des versions à la prochaine demande"""
+        self._loaded_at = 0.0
+
+class AsyncDataVersions(DataVersions):
+    """Même lecture des versions pour l'API async (driver MongoDB asynchrone, verrou asyncio)"""
+
+    def __init__(self, collection, ttl=1.0):
+        super().__init__(collection, ttl)
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self):
+        now = time.monotonic()
+        if now - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if now - self._loaded_at < self.ttl:
+                return
+            self._versions = {
+                doc["_id"]: (doc.get("version", 0), doc.get("updated_at"))
+                async for doc in self.collection.find({}, {"version": 1, "updated_at": 1})
+            }
+            self._loaded_at = time.monotonic()
+
+    async def get(self, key):
+        await self._refresh()
+        return self._versions.get(key, (0, None))[0]
+
+    async def updated_at(self, key):
+        await self._refresh()
+        return self._versions.get(key, (0, None))[1]
+
+    async def all(self):
+        await self._refresh()
+        return {key: value[0] for key, value in self._versions.items()}
+
+class ResponseCache:
+    """Cache de valeurs par clé, valable tant que la version de données associée ne change pas"""
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._async_locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, version, build):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # Un seul calcul par clé même si de nombreux clients arrivent en même temps
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            value = build()
+            self._entries[key] = (version, value)
+            return value
+
+    async def get_or_build_async(self, key, version, build):
+        """Variante async : build est une coroutine, un seul calcul par clé à la fois"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        key_lock = self._async_locks.setdefault(key, asyncio.Lock())
+        async with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            value = await build()
+            self._entries[key] = (version, value)
+            return value
+
+    def clear(self):
+        self._entries.clear()
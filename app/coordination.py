@@ -0,0 +1,149 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Collection des documents partagés entre les workers (bail du scheduler, statut du scraping)
+APP_STATE_COLLECTION = "app_state"
+# Demandes de scraping reçues par les workers qui ne pilotent pas le scraping
+SCRAPE_REQUESTS_COLLECTION = "scrape_requests"
+
+# Document de statut du scraping dans app_state
+STATUS_KEY = "scraping_status"
+
+def status_defaults(total_leagues):
+    """Statut partagé avant le premier scraping"""
+    return {
+        "initial_scraping_done": False,
+        "scraping_status": {
+            "phase": "starting",  # starting, scraping, ready
+            "message": "Initialisation...",
+            "progress": 0,
+            "leagues_done": 0,
+            "total_leagues": total_leagues
+        },
+        "scraping_in_progress": False,
+        "scraping_jobs": [],
+        "schedule": {}
+    }
+
+class LeaderLease:
+    """Bail MongoDB : un seul worker à la fois pilote le scraping (renouvelé tant que le process vit)"""
+
+    def __init__(self, collection, name, ttl=30):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._leader = False
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self):
+        # Sans renouvellement réussi (MongoDB injoignable), le bail est considéré perdu à son expiration :
+        # un autre worker peut alors le prendre
+        return self._leader and time.monotonic() < self._valid_until
+
+    def try_acquire(self):
+        """Prend ou renouvelle le bail, renvoie True si ce process le détient"""
+        now = datetime.now()
+        renewed_at = time.monotonic()
+        try:
+            self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            acquired = True
+        except DuplicateKeyError:
+            # Bail valide détenu par un autre worker : l'upsert entre en conflit sur _id
+            acquired = False
+
+        if self._leader and not acquired:
+            print(f"[LEASE] Bail '{self.name}' perdu par {self.holder}")
+        self._leader = acquired
+        if acquired:
+            self._valid_until = renewed_at + self.ttl
+        return acquired
+
+    def holds(self):
+        """Bail toujours détenu selon MongoDB (vérifié avant chaque écriture du pilote)"""
+        if not self.is_leader:
+            return False
+        try:
+            return self.collection.count_documents(
+                {"_id": self.name, "holder": self.holder, "expires_at": {"$gt": datetime.now()}}, limit=1
+            ) > 0
+        except Exception as e:
+            print(f"[LEASE] Vérification du bail impossible: {e}")
+            return False
+
+    def release(self):
+        self.collection.delete_one({"_id": self.name, "holder": self.holder})
+        self._leader = False
+
+class LeaderServices:
+    """Services du pilote alignés sur le bail : démarrés à sa prise, arrêtés à sa perte, relancés ensuite"""
+
+    def __init__(self, lease, start, stop):
+        self.lease = lease
+        self._start = start
+        self._stop = stop
+        self.running = False
+
+    def sync(self):
+        """Appelé à chaque tour de la boucle de coordination, renvoie True si les services tournent"""
+        leader = self.lease.is_leader
+        if leader and not self.running:
+            self.running = True
+            try:
+                self._start()
+            except Exception:
+                # Démarrage partiel : tout est arrêté, nouvel essai au tour suivant
+                self.running = False
+                self._stop()
+                raise
+        elif not leader and self.running:
+            # Arrêtés même en cas d'erreur : deux pilotes ne doivent jamais scraper en même temps
+            self.running = False
+            self._stop()
+        return self.running
+
+class SharedStatus:
+    """Document de statut commun à tous les workers, relu au plus une fois par intervalle"""
+
+    def __init__(self, collection, key, defaults, ttl=1.0):
+        self.collection = collection
+        self.key = key
+        self.defaults = defaults
+        self.ttl = ttl
+        self._value = dict(defaults)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._loaded_at >= self.ttl:
+            with self._lock:
+                doc = self.collection.find_one({"_id": self.key}) or {}
+                doc.pop("_id", None)
+                self._value = {**self.defaults, **doc}
+                self._loaded_at = time.monotonic()
+        return self._value
+
+    def update(self, **fields):
+        self.collection.update_one({"_id": self.key}, {"$set": fields}, upsert=True)
+        with self._lock:
+            self._value = {**self._value, **fields}
+
+    def reset(self):
+        """Repart des valeurs par défaut (démarrage d'un nouveau pilote)"""
+        self.collection.replace_one({"_id": self.key}, dict(self.defaults), upsert=True)
+        with self._lock:
+            self._value = dict(self.defaults)
+            self._loaded_at = time.monotonic()
@@ -0,0 +1,142 @@
+import asyncio
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+class AsyncSubscription:
+    """File asyncio d'un client SSE servi par l'API async, alimentée depuis le thread du flux"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, message):
+        # Appelé par le thread du flux : la file n'est manipulée que dans la boucle d'événements
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client trop lent : même traitement que les files synchrones
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"league_id": message.get("league_id"), "resync": True})
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class ChangeFeed:
+    """Relaie aux clients SSE les change sets publiés par le scraper (collection match_changes)"""
+
+    def __init__(self, collection, poll_interval=1.0, max_queue=50):
+        self.collection = collection
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self._subscribers = {}  # league_id -> set de files
+        self._listeners = []  # fonctions appelées avec chaque change set, toutes ligues
+        self._seen = {}  # _id -> instant de lecture (dédoublonnage de la fenêtre glissante)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, league_id):
+        """Nouvelle file de messages pour une ligue (démarre le suivi au premier abonné)"""
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(league_id, set()).add(subscription)
+            self._start()
+        return subscription
+
+    def subscribe_async(self, league_id):
+        """Abonnement d'une coroutine (API async) : un client connecté n'occupe aucun thread"""
+        subscription = AsyncSubscription(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(league_id, set()).add(subscription)
+            self._start()
+        return subscription
+
+    def add_listener(self, callback):
+        """Enregistre une fonction appelée (dans le thread du flux) avec chaque change set"""
+        with self._lock:
+            self._listeners.append(callback)
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+            self._thread.start()
+
+    def unsubscribe(self, league_id, subscription):
+        with self._lock:
+            self._subscribers.get(league_id, set()).discard(subscription)
+
+    def notify(self):
+        """Relit match_changes immédiatement (appelé quand le scraper du process a écrit)"""
+        self._wake.set()
+
+    def _run(self):
+        # Les change sets antérieurs au démarrage ne sont pas rejoués
+        started = datetime.now(timezone.utc)
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self._poll(started)
+            except Exception as e:
+                print(f"[STREAM] Erreur lecture des change sets: {e}")
+                time.sleep(self.poll_interval)
+
+    def _poll(self, started):
+        # Fenêtre glissante sur l'_id : tolère des inserts concurrents dans la même seconde
+        since = max(started, datetime.now(timezone.utc) - timedelta(seconds=10))
+        for doc in self.collection.find({"_id": {"$gte": ObjectId.from_datetime(since)}}).sort("_id", 1):
+            if doc["_id"] in self._seen:
+                continue
+            self._seen[doc["_id"]] = time.monotonic()
+            self._publish(doc)
+
+        expired = time.monotonic() - 30
+        for doc_id in [doc_id for doc_id, seen_at in self._seen.items() if seen_at < expired]:
+            del self._seen[doc_id]
+
+    def _publish(self, doc):
+        league_id = doc.get("league_id")
+        message = {
+            "league_id": league_id,
+            "version": doc.get("version"),
+            "added": doc.get("added", []),
+            "changed": doc.get("changed", []),
+            "removed": doc.get("removed", []),
+            "finished": doc.get("finished", []),
+            "rows": doc.get("rows", []),
+            "details": doc.get("details", {})
+        }
+        with self._lock:
+            # Meilleures cotes des pages match seules : rien à afficher pour les clients SSE
+            subscribers = list(self._subscribers.get(league_id, ())) if "details" not in doc else []
+            listeners = list(self._listeners)
+
+        for callback in listeners:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"[STREAM] Erreur listener: {e}")
+
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except RuntimeError:
+                # Boucle d'événements fermée (arrêt du worker) : abonnement abandonné
+                self.unsubscribe(league_id, subscription)
+            except queue.Full:
+                # Client trop lent : on vide sa file et il recharge toute la ligue
+                while not subscription.empty():
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        break
+                subscription.put_nowait({"league_id": league_id, "resync": True})
@@ -0,0 +1,24 @@
+import os
+
+# Serveur de production : plusieurs process, chacun avec un pool de threads pour les vues Flask
+# (flux SSE servis en async en mode asgi, plafonnés à WEB_MAX_STREAMS par process en mode wsgi)
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 2)))
+threads = int(os.getenv("WEB_THREADS", "16"))
+
+# asgi : API JSON en lecture servie en async (asgi.py), wsgi : tout par Flask
+if os.getenv("WEB_MODE", "asgi") == "asgi":
+    wsgi_app = "asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "app:app"
+    worker_class = "gthread"
+timeout = 120
+graceful_timeout = 30
+accesslog = "-"
+
+def post_worker_init(worker):
+    # Les threads ne survivent pas au fork : chaque worker lance sa propre coordination,
+    # un seul d'entre eux (le détenteur du bail MongoDB) pilote le scraping
+    from app import start_background_services
+    start_background_services()
@@ -0,0 +1,215 @@
+import threading
+import time
+
+from payloads import LEAGUES
+
+# Issues 1/X/2 : champ de la cote moyenne (page ligue) pour chacune
+OUTCOMES = [("1", "odd_1"), ("X", "odd_x"), ("2", "odd_2")]
+
+MATCH_PROJECTION = {
+    "_id": 0, "match_key": 1, "league_id": 1, "home_team": 1, "away_team": 1, "date": 1, "time": 1,
+    "odd_1": 1, "odd_x": 1, "odd_2": 1, "is_live": 1, "is_finished": 1
+}
+DETAIL_PROJECTION = {"markets.1x2.best": 1, "markets.1x2.best_bookmakers": 1}
+
+def valid_odds(odds):
+    return all(isinstance(odd, (int, float)) and odd > 1 for odd in odds)
+
+def compute_opportunity(league_id, match, best_1x2=None):
+    """Meilleures cotes, somme des probabilités implicites, marge et edge d'un match (None sans cotes)"""
+    average = [match.get(field) for _, field in OUTCOMES]
+    if best_1x2 and valid_odds(best_1x2.get("best") or []):
+        best, bookmakers, source = best_1x2["best"], best_1x2["best_bookmakers"], "bookmakers"
+    elif valid_odds(average):
+        best, bookmakers, source = average, ["average"] * len(OUTCOMES), "average"
+    else:
+        return None
+
+    implied = sum(1 / odd for odd in best)
+    # Probabilités « justes » : cotes moyennes sans la marge des bookmakers
+    reference = average if valid_odds(average) else best
+    overround = sum(1 / odd for odd in reference)
+    fair = [(1 / odd) / overround for odd in reference]
+    value = [odd * probability - 1 for odd, probability in zip(best, fair)]
+
+    arbitrage = implied < 1
+    # Edge : rendement garanti d'un arbitrage, sinon espérance de la meilleure issue
+    edge = 1 / implied - 1 if arbitrage else max(value)
+    labels = [label for label, _ in OUTCOMES]
+    return {
+        "match_key": match["match_key"],
+        "league_id": league_id,
+        "home_team": match.get("home_team"),
+        "away_team": match.get("away_team"),
+        "date": match.get("date"),
+        "time": match.get("time"),
+        "is_live": match.get("is_live", False),
+        "source": source,
+        "best_odds": dict(zip(labels, best)),
+        "best_bookmakers": dict(zip(labels, bookmakers)),
+        "implied_sum": round(implied, 4),
+        "margin": round(implied - 1, 4),
+        "average_margin": round(overround - 1, 4),
+        "value": {label: round(v, 4) for label, v in zip(labels, value)},
+        "kind": "arbitrage" if arbitrage else ("value" if edge > 0 else "none"),
+        "edge": round(edge, 4)
+    }
+
+class OpportunityBook:
+    """Table en mémoire des meilleures cotes 1/X/2 par match, recalculée match par match"""
+
+    def __init__(self, collection, details_collection, change_feed, retry_interval=30):
+        self.collection = collection
+        self.details_collection = details_collection
+        self.change_feed = change_feed
+        self.retry_interval = retry_interval
+        self._entries = {}  # match_key -> opportunité
+        self._best = {}  # match_key -> meilleures cotes 1X2 par bookmaker (pages match)
+        self._matches = {}  # match_key -> (league_id, dernière ligne connue)
+        self._ranked = None
+        self._lock = threading.Lock()
+        self._started = False
+        self._loading = False
+        self._pending = []  # change sets reçus pendant une lecture complète, rejoués après elle
+
+    def start(self):
+        """Chargement complet, puis change sets des pages ligue et des pages match"""
+        if self._started:
+            return self
+        self._started = True
+        # Abonné avant la lecture complète : les change sets publiés pendant celle-ci sont mis de côté
+        # puis rejoués sur la table chargée (une lecture plus ancienne n'écrase jamais un change set)
+        self.change_feed.add_listener(self.apply_changes)
+        threading.Thread(target=self._run, name="opportunities", daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.load()
+                break
+            except Exception as e:
+                print(f"[OPPORTUNITIES] Chargement impossible, nouvel essai: {e}")
+                time.sleep(self.retry_interval)
+
+    def load(self):
+        started = time.perf_counter()
+        with self._lock:
+            # Les change sets déjà mis de côté sont antérieurs à la lecture qui commence
+            self._loading = True
+            self._pending = []
+        matches = {
+            match["match_key"]: (match["league_id"], match)
+            for match in self.collection.find(
+                {"match_key": {"$exists": True}, "is_finished": {"$ne": True}}, MATCH_PROJECTION
+            )
+        }
+        best = self._read_details({"_id": {"$in": list(matches)}})
+        with self._lock:
+            self._matches = matches
+            self._best = best
+            self._entries = {}
+            for key in matches:
+                self._recompute(key)
+        replayed = self._replay_pending()
+        print(f"[OPPORTUNITIES] {len(self._entries)} match(s) chargé(s) en {(time.perf_counter() - started) * 1000:.0f} ms, "
+              f"{replayed} change set(s) rejoué(s)")
+
+    def _replay_pending(self):
+        """Rejoue dans l'ordre les change sets reçus pendant la lecture (ceux qui arrivent entre-temps suivent)"""
+        replayed = 0
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._loading = False
+                    return replayed
+                pending, self._pending = self._pending, []
+            for message in pending:
+                self._apply(message)
+            replayed += len(pending)
+
+    def _read_details(self, query):
+        return {
+            doc["_id"]: doc["markets"]["1x2"]
+            for doc in self.details_collection.find(query, DETAIL_PROJECTION)
+            if doc.get("markets", {}).get("1x2")
+        }
+
+    def _recompute(self, key):
+        # Appelé sous verrou
+        league_id, match = self._matches[key]
+        entry = compute_opportunity(league_id, match, self._best.get(key))
+        if entry is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = entry
+        self._ranked = None
+
+    def _forget(self, key):
+        self._matches.pop(key, None)
+        self._best.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._ranked = None
+
+    def apply_changes(self, message):
+        """Change set d'une ligue ou de ses pages match : seuls les matchs concernés sont recalculés"""
+        if message.get("resync"):
+            return
+        with self._lock:
+            if self._loading:
+                self._pending.append(message)
+                return
+        self._apply(message)
+
+    def _apply(self, message):
+        league_id = message["league_id"]
+        rows = [row for row in message.get("rows", []) if row.get("match_key")]
+        # Meilleures cotes par bookmaker des matchs encore inconnus de la table
+        with self._lock:
+            unknown = [row["match_key"] for row in rows if row["match_key"] not in self._matches]
+        best = self._read_details({"_id": {"$in": unknown}}) if unknown else {}
+
+        with self._lock:
+            for key in message.get("removed", []):
+                self._forget(key)
+            self._best.update(best)
+            for row in rows:
+                key = row["match_key"]
+                if row.get("is_finished"):
+                    self._forget(key)
+                    continue
+                self._matches[key] = (league_id, row)
+                self._recompute(key)
+            # Meilleures cotes par bookmaker publiées après l'écriture des détails
+            for key, market in message.get("details", {}).items():
+                if key in self._matches:
+                    self._best[key] = market
+                    self._recompute(key)
+
+    def ranked(self):
+        """Opportunités triées par edge décroissant (tri refait seulement après un changement)"""
+        with self._lock:
+            if self._ranked is None:
+                self._ranked = sorted(self._entries.values(), key=lambda entry: entry["edge"], reverse=True)
+            return self._ranked
+
+    def opportunities(self, league_id=None, kind=None, min_edge=None, limit=50):
+        results = []
+        for entry in self.ranked():
+            if len(results) >= limit or (min_edge is not None and entry["edge"] < min_edge):
+                break
+            if league_id and entry["league_id"] != league_id:
+                continue
+            if kind and entry["kind"] != kind:
+                continue
+            results.append({**entry, "league_name": LEAGUES.get(entry["league_id"], {}).get("name")})
+        return results
+
+    def summary(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "matches": len(entries),
+            "arbitrage": len([e for e in entries if e["kind"] == "arbitrage"]),
+            "value": len([e for e in entries if e["kind"] == "value"])
+        }
@@ -0,0 +1,225 @@
+import hashlib
+import json
+from datetime import datetime
+
+# Requêtes et mise en forme des réponses JSON, partagées par les vues Flask et l'API async
+# (aucune entrée/sortie ici : chaque chemin exécute les requêtes avec son propre driver)
+
+# Configuration des ligues
+LEAGUES = {
+    "ligue-1": {"name": "Ligue 1", "country": "France", "icon": "🇫🇷"},
+    "premier-league": {"name": "Premier League", "country": "England", "icon": "🏴󠁧󠁢󠁥󠁮󠁧󠁿"},
+    "la-liga": {"name": "La Liga", "country": "Spain", "icon": "🇪🇸"},
+    "serie-a": {"name": "Serie A", "country": "Italy", "icon": "🇮🇹"},
+    "bundesliga": {"name": "Bundesliga", "country": "Germany", "icon": "🇩🇪"}
+}
+
+def make_etag(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+def serialize_match(match):
+    """Document match prêt pour le JSON (_id et dates en texte)"""
+    match["_id"] = str(match["_id"])
+    if "datetime" in match:
+        match["datetime"] = match["datetime"].isoformat()
+    if "scraped_at" in match:
+        match["scraped_at"] = match["scraped_at"].isoformat()
+    return match
+
+def live_first(match):
+    """Tri des API : matchs en direct d'abord, puis par date"""
+    return (not match.get("is_live", False), match.get("datetime", datetime.max))
+
+def matches_payload(league_id, matches, updated_at):
+    """Corps de /api/matches"""
+    matches.sort(key=live_first)
+    for match in matches:
+        serialize_match(match)
+
+    total = len(matches)
+    live = len([m for m in matches if m.get('is_live', False)])
+    finished = len([m for m in matches if m.get('is_finished', False)])
+    upcoming = total - live - finished
+
+    return {
+        "status": "success",
+        "league_id": league_id,
+        "league_name": LEAGUES[league_id]['name'],
+        "stats": {
+            "total": total,
+            "live": live,
+            "upcoming": upcoming,
+            "finished": finished
+        },
+        "matches": matches,
+        "updated_at": (updated_at or datetime.now()).isoformat()
+    }
+
+TEAMS_PROJECTION = {"_id": 0, "home_team": 1, "away_team": 1}
+
+def teams_payload(league_id, matches):
+    """Corps de /api/teams"""
+    teams = set()
+    for match in matches:
+        if match.get("home_team"):
+            teams.add(match["home_team"])
+        if match.get("away_team"):
+            teams.add(match["away_team"])
+
+    return {
+        "status": "success",
+        "league_id": league_id,
+        "teams": sorted(teams)
+    }
+
+def team_matches_filter(league_id, team):
+    return {
+        "league_id": league_id,
+        "$or": [{"home_team": team}, {"away_team": team}]
+    }
+
+def team_matches_payload(league_id, team, matches):
+    """Corps de /api/team-matches"""
+    matches.sort(key=live_first)
+    for match in matches:
+        serialize_match(match)
+
+    return {
+        "status": "success",
+        "league_id": league_id,
+        "team": team,
+        "count": len(matches),
+        "matches": matches
+    }
+
+# Pipelines d'agrégation : les calculs de cotes se font côté MongoDB
+ODDS_TYPES = [("odd_1", "Domicile"), ("odd_x", "Nul"), ("odd_2", "Extérieur")]
+
+def odd_expr(field):
+    """Expression d'agrégation : cote numérique, null si non proposée"""
+    return {"$cond": [{"$isNumber": f"${field}"}, f"${field}", None]}
+
+def score_expr(field):
+    """Expression d'agrégation : score entier (0 s'il n'est pas connu)"""
+    return {"$ifNull": [f"${field}", 0]}
+
+def odds_unwind_stages():
+    """Étapes produisant un document par cote : {value, type, home, away, date}"""
+    return [
+        {"$project": {
+            "_id": 0,
+            "home": "$home_team",
+            "away": "$away_team",
+            "date": {"$ifNull": ["$date", ""]},
+            "odds": [{"type": label, "value": odd_expr(field)} for field, label in ODDS_TYPES]
+        }},
+        {"$unwind": "$odds"},
+        {"$match": {"odds.value": {"$ne": None}}},
+        {"$project": {"home": 1, "away": 1, "date": 1, "type": "$odds.type", "value": "$odds.value"}}
+    ]
+
+# Bornes basses des tranches de cotes (distribution renvoyée à la place de toutes les valeurs)
+ODDS_BUCKETS = [1, 1.25, 1.5, 1.75, 2, 2.5, 3, 4, 5, 7.5, 10]
+ODDS_BUCKET_OVERFLOW = "10+"
+# Cotes détaillées (match, type, date) renvoyées au plus par /api/all-odds
+ALL_ODDS_LIMIT = 300
+
+def odds_histogram(value):
+    """Étapes comptant les cotes par tranche ($bucket), quel que soit le nombre de matchs"""
+    return [
+        {"$match": {value: {"$ne": None}}},
+        {"$bucket": {
+            "groupBy": f"${value}",
+            "boundaries": ODDS_BUCKETS,
+            "default": ODDS_BUCKET_OVERFLOW,
+            "output": {"count": {"$sum": 1}}
+        }}
+    ]
+
+def histogram_payload(buckets):
+    return [{"from": bucket["_id"], "count": bucket["count"]} for bucket in buckets]
+
+def team_results_stage(team_field, goals_for, goals_against):
+    """Bilan (joués, victoires, nuls, défaites) par équipe sur les matchs terminés"""
+    finished = {"$eq": ["$is_finished", True]}
+    return [{"$group": {
+        "_id": f"${team_field}",
+        "played": {"$sum": {"$cond": [finished, 1, 0]}},
+        "wins": {"$sum": {"$cond": [{"$and": [finished, {"$gt": [goals_for, goals_against]}]}, 1, 0]}},
+        "draws": {"$sum": {"$cond": [{"$and": [finished, {"$eq": [goals_for, goals_against]}]}, 1, 0]}},
+        "losses": {"$sum": {"$cond": [{"$and": [finished, {"$lt": [goals_for, goals_against]}]}, 1, 0]}}
+    }}]
+
+def rounded(value):
+    return round(value, 2) if value is not None else 0
+
+def stats_pipeline(league_id):
+    """Agrégation unique de /api/stats (compteurs, cotes moyennes, bilans par équipe)"""
+    return [
+        {"$match": {"league_id": league_id}},
+        {"$addFields": {"_sh": score_expr("score_home"), "_sa": score_expr("score_away")}},
+        {"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "finished": {"$sum": {"$cond": [{"$eq": ["$is_finished", True]}, 1, 0]}},
+                "live": {"$sum": {"$cond": [{"$eq": ["$is_live", True]}, 1, 0]}}
+            }}],
+            "odds": [{"$group": {
+                "_id": None,
+                "avg_1": {"$avg": odd_expr("odd_1")},
+                "avg_x": {"$avg": odd_expr("odd_x")},
+                "avg_2": {"$avg": odd_expr("odd_2")},
+                "min_1": {"$min": odd_expr("odd_1")},
+                "max_1": {"$max": odd_expr("odd_1")},
+                "samples": {"$sum": {"$cond": [{"$ne": [odd_expr("odd_1"), None]}, 1, 0]}}
+            }}],
+            "home": team_results_stage("home_team", "$_sh", "$_sa"),
+            "away": team_results_stage("away_team", "$_sa", "$_sh")
+        }}
+    ]
+
+def stats_payload(league_id, result):
+    """Corps de /api/stats à partir du résultat de stats_pipeline"""
+    summary = result["summary"][0] if result["summary"] else {"total": 0, "finished": 0, "live": 0}
+    odds = result["odds"][0] if result["odds"] else {}
+
+    # Statistiques par équipe (domicile + extérieur)
+    team_stats = {}
+    for row in result["home"] + result["away"]:
+        if not row["_id"]:
+            continue
+        stats = team_stats.setdefault(row["_id"], {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0})
+        for key in stats:
+            stats[key] += row[key]
+
+    return {
+        "status": "success",
+        "league_id": league_id,
+        "league_name": LEAGUES[league_id]['name'],
+        "summary": {
+            "total_matches": summary["total"],
+            "finished": summary["finished"],
+            "live": summary["live"],
+            "upcoming": summary["total"] - summary["finished"] - summary["live"]
+        },
+        "team_stats": team_stats,
+        "odds": {
+            "avg_1": rounded(odds.get("avg_1")),
+            "avg_x": rounded(odds.get("avg_x")),
+            "avg_2": rounded(odds.get("avg_2")),
+            "min_1": odds.get("min_1") or 0,
+            "max_1": odds.get("max_1") or 0,
+            "samples": odds.get("samples", 0)
+        }
+    }
+
+def status_payload(shared):
+    """Partie de /api/status issue du document de statut partagé"""
+    return {
+        "initial_scraping_done": shared["initial_scraping_done"],
+        "scraping_in_progress": shared["scraping_in_progress"],
+        "scraping_jobs": shared["scraping_jobs"],
+        "schedule": shared["schedule"],
+        "scraping_status": shared["scraping_status"]
+    }
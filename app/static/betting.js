@@ -85,7 +85,7 @@ class BettingSystem {
             const sameMatchIndex = this.selections.findIndex(s => s.home_team === home && s.away_team === away);
             if (sameMatchIndex !== -1) this.selections.splice(sameMatchIndex, 1);
 
-            this.selections.push({ id, league_id: leagueId, home_team: home, away_team: away, bet_type: betType, odd: odd });
+            this.selections.push({ id, league_id: leagueId, match_key: matchCard.dataset.matchKey || null, home_team: home, away_team: away, bet_type: betType, odd: odd });
         }
 
         this.saveSelections();
@@ -177,6 +177,9 @@ class BettingSystem {
                 this.selections = [];
                 this.saveSelections();
                 window.location.href = '/my-bets';
+            } else {
+                const result = await response.json().catch(() => ({}));
+                alert(`❌ ${result.error || "Pari refusé"}`);
             }
         } catch (e) { alert("Erreur de connexion"); }
     }
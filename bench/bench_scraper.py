@@ -0,0 +1,231 @@
+import argparse
+import functools
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from pymongo import MongoClient, monitoring
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+import db_setup
+import scraper_mongo
+from scraper_mongo import LEAGUES, DriverPool, empty_report, scrape_all_leagues
+
+from fixtures import FIXTURES_DIR, write_fixtures, record_fixtures
+
+# Scénarios comparés : exécution (pool), extraction, chemin d'écriture, récupération de la page
+SCENARIOS = {
+    "sequential": {"pool_size": 0, "extraction": "snapshot", "writes": "bulk", "fetcher": "selenium"},
+    "parallel": {"pool_size": 3, "extraction": "snapshot", "writes": "bulk", "fetcher": "selenium"},
+    "parallel-elements": {"pool_size": 3, "extraction": "elements", "writes": "bulk", "fetcher": "selenium"},
+    "parallel-rows": {"pool_size": 3, "extraction": "snapshot", "writes": "rows", "fetcher": "selenium"},
+    # Pages servies en HTML : aucune session Chromium lancée tant que le chemin HTTP réussit
+    "http": {"pool_size": 3, "extraction": "snapshot", "writes": "bulk", "fetcher": "http"},
+}
+
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+# Chemin d'écriture actuel du scraper (bulk_write non ordonné)
+BULK_WRITE = scraper_mongo.write_league_matches
+
+# Ligue en cours de scraping dans le thread courant (attribution des compteurs)
+_context = threading.local()
+_lock = threading.Lock()
+_counters = {}
+
+def counters(league_id=None):
+    league_id = league_id or getattr(_context, "league_id", None) or "_"
+    with _lock:
+        return _counters.setdefault(league_id, {
+            "rows": 0, "driver_commands": 0, "db_commands": 0, "db_writes": 0,
+            "extract_s": 0.0, "parse_s": 0.0, "total_s": 0.0
+        })
+
+def count(field, amount=1):
+    stats = counters()
+    with _lock:
+        stats[field] += amount
+
+class CommandCounter(monitoring.CommandListener):
+    """Compte les allers-retours MongoDB et les commandes d'écriture par ligue"""
+
+    def started(self, event):
+        count("db_commands")
+        if event.command_name in WRITE_COMMANDS:
+            count("db_writes")
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def timed(field, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            count(field, time.perf_counter() - started)
+    return wrapper
+
+def instrument():
+    """Branche les compteurs sur les fonctions du scraper (appelées par leur nom de module)"""
+    create_driver = scraper_mongo.create_driver
+    scrape_league = scraper_mongo.scrape_league
+    parse_snapshot = scraper_mongo.parse_snapshot
+
+    def counting_driver():
+        # Toutes les commandes WebDriver (y compris celles des WebElement) passent par execute
+        driver = create_driver()
+        execute = driver.execute
+        def counted(command, params=None):
+            count("driver_commands")
+            return execute(command, params)
+        driver.execute = counted
+        return driver
+
+    def league_scope(league_id, *args, **kwargs):
+        _context.league_id = league_id
+        try:
+            return timed("total_s", scrape_league)(league_id, *args, **kwargs)
+        finally:
+            _context.league_id = None
+
+    def counted_parse(snapshot, *args, **kwargs):
+        result = timed("parse_s", parse_snapshot)(snapshot, *args, **kwargs)
+        count("rows", result[2])
+        return result
+
+    scraper_mongo.create_driver = counting_driver
+    scraper_mongo.scrape_league = league_scope
+    scraper_mongo.parse_snapshot = counted_parse
+    scraper_mongo.extract_rows = timed("extract_s", scraper_mongo.extract_rows)
+    scraper_mongo.fetch_snapshot = timed("extract_s", scraper_mongo.fetch_snapshot)
+
+def write_rows_individually(collection, league_id, rows, scraped_matches):
+    """Chemin d'écriture de référence : un upsert par match puis le nettoyage (avant bulk_write)"""
+    report = empty_report(league_id)
+    for query, data in rows:
+        scraper_mongo.complete_match(data)
+        result = collection.update_one(query, {"$set": data}, upsert=True)
+        report["inserted"] += 1 if result.upserted_id else 0
+        report["modified"] += result.modified_count
+    if scraped_matches:
+        report["deleted"] = collection.delete_many({
+            "league_id": league_id, "match_key": {"$nin": scraped_matches}
+        }).deleted_count
+    return report
+
+def serve(directory):
+    """Serveur HTTP statique local des pages ligue, renvoie (serveur, url de base)"""
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def run_scenario(name, config, db, league_ids, base_url, league_timeout):
+    """Un cycle complet de scraping sur les pages locales, renvoie les compteurs par ligue"""
+    scraper_mongo.EXTRACTION_MODE = config["extraction"]
+    scraper_mongo.FETCHER = config["fetcher"]
+    scraper_mongo._http_retry_at.clear()
+    scraper_mongo.write_league_matches = (
+        write_rows_individually if config["writes"] == "rows" else BULK_WRITE
+    )
+    for league_id in league_ids:
+        LEAGUES[league_id]["url"] = f"{base_url}/{league_id}.html"
+
+    _counters.clear()
+    pool = DriverPool(config["pool_size"]) if config["pool_size"] > 0 else None
+    started = time.perf_counter()
+    try:
+        scrape_all_leagues(db["matches"], pool, league_ids=league_ids, league_timeout=league_timeout)
+    finally:
+        wall = time.perf_counter() - started
+        if pool:
+            pool.close()
+
+    leagues = {league_id: dict(counters(league_id)) for league_id in league_ids}
+    return {"scenario": name, **config, "wall_s": wall, "leagues": leagues}
+
+def print_result(result, run):
+    print(f"\n=== {result['scenario']} (run {run}) : pool={result['pool_size']} "
+          f"extraction={result['extraction']} écritures={result['writes']} récupération={result['fetcher']} ===")
+    print(f"{'ligue':<16}{'matchs':>8}{'extract ms':>12}{'parse ms':>10}{'total s':>9}"
+          f"{'cmd WebDriver':>15}{'cmd Mongo':>11}{'écritures':>11}{'matchs/s':>10}")
+    total_rows = 0
+    for league_id, stats in result["leagues"].items():
+        total_rows += stats["rows"]
+        rate = stats["rows"] / stats["total_s"] if stats["total_s"] else 0
+        print(f"{league_id:<16}{stats['rows']:>8}{stats['extract_s'] * 1000:>12.1f}{stats['parse_s'] * 1000:>10.1f}"
+              f"{stats['total_s']:>9.2f}{stats['driver_commands']:>15}{stats['db_commands']:>11}"
+              f"{stats['db_writes']:>11}{rate:>10.1f}")
+    print(f"{'TOTAL':<16}{total_rows:>8}   durée {result['wall_s']:.2f}s, "
+          f"{total_rows / result['wall_s'] if result['wall_s'] else 0:.1f} matchs/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du scraper (pages rejouées en local)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Scénarios à exécuter parmi {', '.join(SCENARIOS)}")
+    parser.add_argument("--leagues", default=",".join(LEAGUES), help="Ligues à scraper")
+    parser.add_argument("--runs", type=int, default=2,
+                        help="Cycles par scénario (le 1er insère, les suivants ne réécrivent que les changements)")
+    parser.add_argument("--matches", type=int, default=60, help="Matchs par page synthétique")
+    parser.add_argument("--churn", type=float, default=0.1,
+                        help="Part des cotes modifiées entre deux cycles (pages synthétiques)")
+    parser.add_argument("--fixtures", help="Dossier de pages enregistrées (défaut : pages synthétiques)")
+    parser.add_argument("--record", action="store_true",
+                        help=f"Enregistrer les vraies pages OddsPortal dans {FIXTURES_DIR} puis quitter")
+    parser.add_argument("--mongo", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"),
+                        help="MongoDB locale de test")
+    parser.add_argument("--db", default="odds_bench", help="Base vidée avant chaque scénario")
+    parser.add_argument("--league-timeout", type=int, default=120)
+    parser.add_argument("--json", help="Écrire aussi les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    league_ids = [league_id for league_id in args.leagues.split(",") if league_id]
+    if args.record:
+        record_fixtures(league_ids)
+        return
+
+    instrument()
+    client = MongoClient(args.mongo, event_listeners=[CommandCounter()], serverSelectionTimeoutMS=5000)
+    db = client[args.db]
+
+    results = []
+    with tempfile.TemporaryDirectory() as generated:
+        directory = args.fixtures or generated
+        server, base_url = serve(directory)
+        try:
+            for name in args.scenarios.split(","):
+                client.drop_database(args.db)
+                # La base vient d'être supprimée : la collection time-series est à recréer
+                db_setup._odds_history_ready = False
+                db_setup.ensure_indexes(db)
+
+                for run in range(1, args.runs + 1):
+                    if not args.fixtures:
+                        write_fixtures(league_ids, generated, matches=args.matches,
+                                       seed=run - 1, churn=args.churn)
+                    result = run_scenario(name, SCENARIOS[name], db, league_ids, base_url, args.league_timeout)
+                    result["run"] = run
+                    print_result(result, run)
+                    results.append(result)
+        finally:
+            server.shutdown()
+            client.drop_database(args.db)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[BENCH] Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+from db_setup import ensure_indexes, bump_data_version
+from scraper_mongo import LEAGUES, match_key, match_fingerprint
+
+from fixtures import TEAMS
+
+# Collections remplies par le générateur (vidées avant chaque génération)
+SEEDED_COLLECTIONS = ["matches", "bets", "data_versions"]
+
+def league_ids(count):
+    """Les ligues configurées d'abord, puis des ligues synthétiques (stockées mais inconnues de l'API)"""
+    ids = list(LEAGUES)[:count]
+    ids += [f"synthetic-{i}" for i in range(count - len(ids))]
+    return ids
+
+def generate_matches(league_id, count, rng, now):
+    """Documents matchs au format écrit par le scraper (terminés, en direct, à venir)"""
+    info = LEAGUES.get(league_id, {"name": league_id.title(), "country": "Synthetic"})
+    finished = count // 10
+    live = max(1, count // 20)
+    matches = []
+    for i in range(count):
+        home, away = rng.sample(TEAMS, 2)
+        home, away = f"{home} {i}", f"{away} {i}"
+        if i < finished:
+            moment, is_live, is_finished = now - timedelta(hours=rng.randint(3, 48)), False, True
+        elif i < finished + live:
+            moment, is_live, is_finished = now - timedelta(minutes=rng.randint(1, 90)), True, False
+        else:
+            moment, is_live, is_finished = now + timedelta(hours=rng.randint(1, 240)), False, False
+
+        date = moment.strftime("%d %b %Y")
+        played = is_live or is_finished
+        match = {
+            "league_id": league_id,
+            "league_name": info["name"],
+            "country": info["country"],
+            "home_team": home,
+            "away_team": away,
+            "date": date,
+            "time": moment.strftime("%H:%M"),
+            "odd_1": round(rng.uniform(1.2, 6.0), 2),
+            "odd_x": round(rng.uniform(2.5, 5.0), 2),
+            "odd_2": round(rng.uniform(1.2, 8.0), 2),
+            "score_home": rng.randint(0, 4) if played else None,
+            "score_away": rng.randint(0, 4) if played else None,
+            "datetime": moment,
+            "is_live": is_live,
+            "is_finished": is_finished,
+            "match_key": match_key(league_id, home, away, date),
+            "match_id": f"{league_id}_{home}_{away}_{date}".replace(" ", "_"),
+            "scraped_at": now,
+            "first_seen_at": now
+        }
+        match["fingerprint"] = match_fingerprint(match)
+        matches.append(match)
+    return matches
+
+def generate_bets(matches, count, rng, now):
+    """Paris combinés de 1 à 3 sélections, la plupart en attente"""
+    bets = []
+    for _ in range(count):
+        picks = rng.sample(matches, min(len(matches), rng.randint(1, 3)))
+        selections = []
+        total_odd = 1.0
+        for match in picks:
+            bet_type, field = rng.choice([("1", "odd_1"), ("X", "odd_x"), ("2", "odd_2")])
+            total_odd *= match[field]
+            # Même forme que les sélections envoyées par betting.js
+            selections.append({
+                "id": match["match_id"],
+                "league_id": match["league_id"],
+                "match_key": match["match_key"],
+                "home_team": match["home_team"],
+                "away_team": match["away_team"],
+                "bet_type": bet_type,
+                "odd": match[field]
+            })
+        stake = rng.choice([5, 10, 20, 50])
+        settled = all(match["is_finished"] for match in picks) and rng.random() < 0.8
+        bets.append({
+            "selections": selections,
+            "match_keys": [s["match_key"] for s in selections],
+            "stake": stake,
+            "total_odd": round(total_odd, 2),
+            "potential_win": round(stake * total_odd, 2),
+            "status": rng.choice(["won", "lost"]) if settled else "pending",
+            "created_at": now - timedelta(minutes=rng.randint(1, 10000)),
+            "resolved_at": now if settled else None
+        })
+    return bets
+
+def seed_database(db, leagues=5, matches=200, bets=1000, seed=0):
+    """Remplace le contenu de la base par un jeu synthétique, renvoie les ligues générées"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    for name in SEEDED_COLLECTIONS:
+        db[name].drop()
+    ensure_indexes(db)
+
+    ids = league_ids(leagues)
+    all_matches = []
+    for league_id in ids:
+        league_matches = generate_matches(league_id, matches, rng, now)
+        db["matches"].insert_many(league_matches, ordered=False)
+        bump_data_version(db, league_id)
+        all_matches.extend(league_matches)
+
+    for start in range(0, bets, 1000):
+        db["bets"].insert_many(generate_bets(all_matches, min(1000, bets - start), rng, now), ordered=False)
+    bump_data_version(db, "bets")
+
+    print(f"[BENCH] Base {db.name} : {len(ids)} ligues, {len(all_matches)} matchs, {bets} paris")
+    return ids
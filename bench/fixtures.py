@@ -0,0 +1,109 @@
+import html
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+from scraper_mongo import LEAGUES, create_driver, wait_until_ready
+
+# Pages ligue rejouées par le benchmark (une par ligue : <league_id>.html)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+TEAMS = [
+    "Paris SG", "Marseille", "Lyon", "Monaco", "Lille", "Rennes", "Nice", "Lens", "Nantes", "Brest",
+    "Arsenal", "Chelsea", "Liverpool", "Everton", "Fulham", "Brighton", "Wolves", "Burnley",
+    "Real Madrid", "Barcelona", "Sevilla", "Valencia", "Getafe", "Girona", "Betis", "Osasuna",
+    "Inter", "Milan", "Juventus", "Napoli", "Roma", "Lazio", "Torino", "Bologna",
+    "Bayern", "Dortmund", "Leipzig", "Leverkusen", "Freiburg", "Mainz", "Augsburg", "Bochum",
+]
+
+DATE_ROW = '<div class="text-black-main font-main w-full truncate text-xs font-normal leading-5">{}</div>'
+GAME_ROW = """<div data-testid="game-row">
+  <div data-testid="time-item"><p>{time}</p></div>
+  <a href="/football/bench/{league}/match-{index}/">
+    <p class="participant-name truncate">{home}</p>
+    <p class="participant-name truncate">{away}</p>
+  </a>
+  {scores}
+  <div data-testid="odd-container-1"><p>{odd_1}</p></div>
+  <div data-testid="odd-container-x"><p>{odd_x}</p></div>
+  <div data-testid="odd-container-2"><p>{odd_2}</p></div>
+</div>"""
+SCORE = '<div class="hidden" data-v-143a5c06>{}</div>'
+
+def generate_page(league_id, matches=60, live=4, finished=6, days=5, seed=0, churn=0.0):
+    """Page ligue synthétique au balisage OddsPortal (mêmes sélecteurs que le scraper)
+
+    churn : part des matchs dont les cotes changent par rapport à la graine 0
+    (pour mesurer les écritures d'un scraping où seule une partie de la page bouge)."""
+    rng = random.Random(f"{league_id}:0")
+    moves = random.Random(f"{league_id}:{seed}")
+    today = datetime.now()
+    rows = []
+    current_day = None
+
+    for i in range(matches):
+        home, away = rng.sample(TEAMS, 2)
+        odds = [rng.uniform(1.2, 6.0) for _ in range(3)]
+        if seed and moves.random() < churn:
+            odds = [odd * moves.uniform(0.9, 1.1) for odd in odds]
+
+        if i < finished:
+            day, time_text, scores = today, "FT", (rng.randint(0, 4), rng.randint(0, 4))
+        elif i < finished + live:
+            day, time_text, scores = today, f"{rng.randint(1, 90)}'", (rng.randint(0, 3), rng.randint(0, 3))
+        else:
+            day = today + timedelta(days=1 + (i - finished - live) * days // max(1, matches - finished - live))
+            time_text, scores = f"{rng.choice([13, 15, 17, 19, 21]):02d}:{rng.choice(['00', '30', '45'])}", None
+
+        if current_day != day.date():
+            current_day = day.date()
+            offset = (day.date() - today.date()).days
+            if offset == 0:
+                label = f"Today, {day.day:02d} {day:%b}"
+            elif offset == 1:
+                label = f"Tomorrow, {day.day:02d} {day:%b}"
+            else:
+                label = f"{day.day:02d} {day:%b %Y}"
+            rows.append(DATE_ROW.format(label))
+
+        rows.append(GAME_ROW.format(
+            league=league_id,
+            index=i,
+            time=time_text,
+            home=html.escape(f"{home} {league_id[:2].upper()}{i}"),
+            away=html.escape(f"{away} {league_id[:2].upper()}{i}"),
+            scores="".join(SCORE.format(score) for score in scores) if scores else "",
+            odd_1=f"{odds[0]:.2f}", odd_x=f"{odds[1]:.2f}", odd_2=f"{odds[2]:.2f}"
+        ))
+
+    return "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{}</title></head><body>\n{}\n</body></html>".format(
+        LEAGUES[league_id]["name"], "\n".join(rows)
+    )
+
+def write_fixtures(league_ids=None, directory=FIXTURES_DIR, **options):
+    """Génère les pages synthétiques de toutes les ligues dans directory"""
+    os.makedirs(directory, exist_ok=True)
+    for league_id in league_ids or LEAGUES:
+        with open(os.path.join(directory, f"{league_id}.html"), "w", encoding="utf-8") as f:
+            f.write(generate_page(league_id, **options))
+    return directory
+
+def record_fixtures(league_ids=None, directory=FIXTURES_DIR):
+    """Enregistre les vraies pages OddsPortal (DOM rendu, scripts retirés pour un rejeu statique)"""
+    os.makedirs(directory, exist_ok=True)
+    driver = create_driver()
+    try:
+        for league_id in league_ids or LEAGUES:
+            driver.get(LEAGUES[league_id]["url"])
+            # Lignes chargées au défilement comprises
+            wait_until_ready(driver, 30)
+            page = re.sub(r"<script\b.*?</script>", "", driver.page_source, flags=re.S | re.I)
+            with open(os.path.join(directory, f"{league_id}.html"), "w", encoding="utf-8") as f:
+                f.write(page)
+            print(f"[BENCH] {LEAGUES[league_id]['name']}: page enregistrée ({len(page) // 1024} Ko)")
+    finally:
+        driver.quit()
+    return directory
@@ -0,0 +1,163 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+
+from datagen import seed_database
+from scraper_mongo import LEAGUES
+
+# Endpoints interrogés en boucle par l'interface ({league} remplacé à chaque requête)
+ENDPOINTS = {
+    "matches": "/api/matches/{league}",
+    "all-odds": "/api/all-odds/{league}",
+    "stats": "/api/stats/{league}",
+    "status": "/api/status",
+    "teams": "/api/teams/{league}",
+    "my-bets": "/api/my-bets",
+}
+
+def percentile(samples, p):
+    """Percentile au rang le plus proche sur des échantillons triés"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(p / 100 * len(samples)) - 1))
+    return samples[rank]
+
+class Poller(threading.Thread):
+    """Client qui enchaîne les requêtes sur une connexion persistante (comme un onglet qui poll)"""
+
+    def __init__(self, base_url, paths, deadline, revalidate, think_time):
+        super().__init__(daemon=True)
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.paths = paths
+        self.deadline = deadline
+        self.revalidate = revalidate
+        self.think_time = think_time
+        self.etags = {}
+        self.samples = []  # (endpoint, durée en s, code HTTP)
+        self.errors = {}
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        i = 0
+        while time.monotonic() < self.deadline:
+            name, path = self.paths[i % len(self.paths)]
+            i += 1
+            headers = {}
+            if self.revalidate and path in self.etags:
+                headers["If-None-Match"] = self.etags[path]
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors[name] = self.errors.get(name, 0) + 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                continue
+            self.samples.append((name, time.perf_counter() - started, response.status))
+            if response.getheader("ETag"):
+                self.etags[path] = response.getheader("ETag")
+            if self.think_time:
+                time.sleep(self.think_time)
+        conn.close()
+
+def run_load(base_url, endpoints, leagues, clients, duration, revalidate, think_time):
+    """Charge les endpoints avec N clients pendant duration secondes, renvoie les mesures par endpoint"""
+    paths = [
+        (name, ENDPOINTS[name].format(league=league))
+        for name in endpoints
+        for league in (leagues if "{league}" in ENDPOINTS[name] else [None])
+    ]
+    deadline = time.monotonic() + duration
+    # Décalage des clients pour ne pas interroger tous le même endpoint au même instant
+    pollers = [Poller(base_url, paths[i % len(paths):] + paths[:i % len(paths)], deadline, revalidate, think_time)
+               for i in range(clients)]
+    started = time.perf_counter()
+    for poller in pollers:
+        poller.start()
+    for poller in pollers:
+        poller.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in endpoints:
+        durations = sorted(d for poller in pollers for n, d, _ in poller.samples if n == name)
+        statuses = [s for poller in pollers for n, _, s in poller.samples if n == name]
+        results[name] = {
+            "requests": len(durations),
+            "errors": sum(poller.errors.get(name, 0) for poller in pollers)
+                      + len([s for s in statuses if s >= 400]),
+            "not_modified": len([s for s in statuses if s == 304]),
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p95_ms": percentile(durations, 95) * 1000,
+            "p99_ms": percentile(durations, 99) * 1000,
+            "rps": len(durations) / elapsed if elapsed else 0
+        }
+    return {"clients": clients, "duration_s": elapsed, "endpoints": results}
+
+def print_result(result, label):
+    print(f"\n=== {label} : {result['clients']} clients, {result['duration_s']:.1f}s ===")
+    print(f"{'endpoint':<12}{'requêtes':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'304':>7}{'erreurs':>9}")
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<12}{stats['requests']:>10}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+              f"{stats['p99_ms']:>9.1f}{stats['not_modified']:>7}{stats['errors']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des endpoints JSON de l'application")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Application déjà démarrée (port gunicorn par défaut)")
+    parser.add_argument("--endpoints", default="matches,all-odds,stats,status",
+                        help=f"Endpoints parmi {', '.join(ENDPOINTS)}")
+    parser.add_argument("--clients", default="1,10,50", help="Paliers de clients simultanés")
+    parser.add_argument("--duration", type=float, default=20, help="Durée de chaque palier (s)")
+    parser.add_argument("--mixed", action="store_true",
+                        help="Tous les endpoints dans la même charge (défaut : un endpoint à la fois)")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Renvoyer l'ETag reçu (If-None-Match) comme le navigateur")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause entre deux requêtes d'un client (s)")
+    parser.add_argument("--seed", action="store_true",
+                        help="Remplacer d'abord le contenu de la base par des données synthétiques")
+    parser.add_argument("--mongo", default=os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"),
+                        help="MongoDB utilisée par l'application")
+    parser.add_argument("--db", default="odds_db", help="Base lue par l'application")
+    parser.add_argument("--leagues", type=int, default=5, help="Nombre de ligues générées")
+    parser.add_argument("--matches", type=int, default=200, help="Matchs générés par ligue")
+    parser.add_argument("--bets", type=int, default=1000, help="Paris générés")
+    parser.add_argument("--json", help="Écrire aussi les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo, serverSelectionTimeoutMS=5000)
+    db = client[args.db]
+    if args.seed:
+        seed_database(db, leagues=args.leagues, matches=args.matches, bets=args.bets)
+    # Seules les ligues connues de l'API sont interrogées
+    stored = set(db["matches"].distinct("league_id"))
+    leagues = [league_id for league_id in LEAGUES if league_id in stored] or list(LEAGUES)
+    client.close()
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    groups = [endpoints] if args.mixed else [[name] for name in endpoints]
+    results = []
+    for clients in [int(n) for n in args.clients.split(",") if n]:
+        for group in groups:
+            result = run_load(args.url, group, leagues, clients, args.duration, args.revalidate, args.think_time)
+            print_result(result, "+".join(group))
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[BENCH] Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+# Historique des cotes : collection time-series et durée de rétention
+ODDS_HISTORY_COLLECTION = "odds_history"
+ODDS_HISTORY_RETENTION_DAYS = int(os.getenv("ODDS_HISTORY_RETENTION_DAYS", "30"))
+# Versions de données (une par ligue) incrémentées à chaque écriture effective du scraper
+DATA_VERSIONS_COLLECTION = "data_versions"
+# Cotes par bookmaker de chaque match (pages match), une entrée par match_key
+MATCH_DETAILS_COLLECTION = "match_details"
+# Durée de conservation des change sets publiés par le scraper
+MATCH_CHANGES_TTL = int(os.getenv("MATCH_CHANGES_TTL", str(24 * 3600)))
+
+_odds_history_ready = False
+
+# Plan d'index : une entrée par requête chaude des deux process (scraper et Flask)
+INDEX_PLAN = {
+    "matches": [
+        # Lectures par ligue (tous les endpoints) + recherche d'une rencontre par équipes
+        IndexModel([("league_id", ASCENDING), ("home_team", ASCENDING), ("away_team", ASCENDING),
+                    ("date", ASCENDING), ("time", ASCENDING)], name="league_teams_date_time"),
+        # Empreintes et nettoyage $nin par ligue
+        IndexModel([("league_id", ASCENDING), ("match_key", ASCENDING)], name="league_match_key"),
+        # Upserts et lectures ponctuelles par clé canonique (anciens documents sans clé exclus)
+        IndexModel([("match_key", ASCENDING)], name="match_key", unique=True,
+                   partialFilterExpression={"match_key": {"$exists": True}}),
+        # clean_old_matches
+        IndexModel([("is_finished", ASCENDING), ("datetime", ASCENDING)], name="finished_datetime"),
+        IndexModel([("is_finished", ASCENDING), ("last_seen_at", ASCENDING)], name="finished_last_seen"),
+    ],
+    "bets": [
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+        IndexModel([("status", ASCENDING), ("resolved_at", DESCENDING)], name="status_resolved_at"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        # Règlement incrémental : paris en attente portant sur les matchs qui viennent de se terminer
+        IndexModel([("status", ASCENDING), ("match_keys", ASCENDING)], name="status_match_keys"),
+    ],
+    "match_changes": [
+        IndexModel([("league_id", ASCENDING), ("created_at", ASCENDING)], name="league_created_at"),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=MATCH_CHANGES_TTL),
+    ],
+    MATCH_DETAILS_COLLECTION: [
+        # Nettoyage des détails des matchs supprimés, par ligue
+        IndexModel([("league_id", ASCENDING)], name="league_id"),
+    ],
+    ODDS_HISTORY_COLLECTION: [
+        IndexModel([("meta.match_key", ASCENDING), ("ts", ASCENDING)], name="match_key_ts"),
+    ],
+}
+
+def ensure_odds_history(db):
+    """Crée la collection time-series de l'historique des cotes si besoin"""
+    global _odds_history_ready
+    if _odds_history_ready:
+        return
+    if ODDS_HISTORY_COLLECTION not in db.list_collection_names():
+        try:
+            # Buckets par match/bookmaker (metaField), granularité minute, purge automatique
+            db.create_collection(
+                ODDS_HISTORY_COLLECTION,
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "minutes"},
+                expireAfterSeconds=ODDS_HISTORY_RETENTION_DAYS * 24 * 3600
+            )
+            print(f"[INFO] Collection {ODDS_HISTORY_COLLECTION} créée (rétention {ODDS_HISTORY_RETENTION_DAYS} jours)")
+        except CollectionInvalid:
+            pass
+    _odds_history_ready = True
+
+def bump_data_version(db, key):
+    """Incrémente la version de données d'une ligue (ou d'une collection) et la renvoie"""
+    doc = db[DATA_VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": key},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+def ensure_indexes(db):
+    """Crée les index du plan (sans effet s'ils existent déjà)"""
+    # La collection time-series doit exister avant d'y poser un index
+    ensure_odds_history(db)
+    
+    for name, indexes in INDEX_PLAN.items():
+        try:
+            created = db[name].create_indexes(indexes)
+            print(f"[INDEX] {name}: {', '.join(created)}")
+        except Exception as e:
+            print(f"[WARN] Index non créés pour {name}: {e}")
+
+def hot_queries():
+    """Requêtes chaudes à vérifier : (collection, filtre, tri)"""
+    league_id = "ligue-1"
+    return [
+        ("matches", {"league_id": league_id}, None),
+        ("matches", {"league_id": league_id, "home_team": "A", "away_team": "B"}, None),
+        ("matches", {"league_id": league_id, "match_key": {"$nin": ["x"]}}, None),
+        ("matches", {"match_key": "x"}, None),
+        ("matches", {"match_key": {"$in": ["x"]}, "is_finished": True}, None),
+        ("matches", {"is_finished": True, "$or": [
+            {"last_seen_at": {"$lt": datetime.now()}},
+            {"last_seen_at": {"$exists": False}, "datetime": {"$lt": datetime.now()}}
+        ]}, None),
+        ("matches", {"is_finished": False, "is_live": False, "datetime": {"$lt": datetime.now()}}, None),
+        ("bets", {"status": "pending"}, {"created_at": -1}),
+        ("bets", {"status": {"$in": ["won", "lost"]}}, {"resolved_at": -1}),
+        ("bets", {}, {"created_at": -1}),
+        ("bets", {"status": "pending", "match_keys": {"$in": ["x"]}}, None),
+        (ODDS_HISTORY_COLLECTION, {"meta.match_key": "x"}, {"ts": 1}),
+    ]
+
+def _plan_stages(plan):
+    """Parcourt récursivement un plan d'exécution et renvoie tous ses noms d'étapes"""
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+def check_query_plans(db):
+    """Explain (sans exécution) des requêtes chaudes, signale celles qui font un COLLSCAN"""
+    collscans = []
+    for name, query_filter, sort in hot_queries():
+        command = {"find": name, "filter": query_filter}
+        if sort:
+            command["sort"] = sort
+        try:
+            explain = db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            print(f"[WARN] Explain impossible sur {name} {query_filter}: {e}")
+            continue
+        
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            collscans.append((name, query_filter, sort))
+            print(f"[INDEX] COLLSCAN sur {name}: filtre={query_filter} tri={sort}")
+    
+    if not collscans:
+        print("[INDEX] Toutes les requêtes chaudes utilisent un index")
+    return collscans
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+    
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://mongodb:27017"), serverSelectionTimeoutMS=5000)
+    database = client["odds_db"]
+    ensure_indexes(database)
+    check_query_plans(database)
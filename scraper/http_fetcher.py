@@ -0,0 +1,133 @@
+import os
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import urllib3
+
+# Lecture du HTML servi uniquement : sur OddsPortal, les lignes de match sont rendues côté client,
+# ce chemin y repasse donc toujours par le navigateur (utile pour des pages servies avec leurs lignes)
+
+# Client HTTP partagé : connexions gardées ouvertes entre les ligues et entre les cycles
+HTTP_POOL_SIZE = int(os.getenv("SCRAPER_HTTP_POOL_SIZE", "5"))
+HTTP_TIMEOUT = int(os.getenv("SCRAPER_HTTP_TIMEOUT", "15"))
+
+HEADERS = {
+    **urllib3.util.make_headers(accept_encoding=True, keep_alive=True),
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+http = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=HTTP_POOL_SIZE,
+    retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)),
+)
+
+# Classes de la ligne date (même sélecteur que ROW_SELECTOR côté navigateur)
+DATE_CLASSES = {"text-black-main", "font-main", "w-full", "truncate", "text-xs", "font-normal", "leading-5"}
+TEAM_CLASSES = {"participant-name", "truncate"}
+SCORE_ATTRIBUTE = "data-v-143a5c06"
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class FetchError(Exception):
+    """Page inexploitable sans navigateur (statut HTTP, ou lignes de match rendues côté client)"""
+
+class SnapshotParser(HTMLParser):
+    """Reproduit SNAPSHOT_JS sur le HTML servi : mêmes lignes date / match, mêmes champs"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.rows = []
+        self._stack = []
+        self._row = None
+        self._row_depth = None
+        self._time_depth = None
+        self._odds_depth = None
+        self._captures = []  # [profondeur de l'élément, destination, morceaux de texte]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        testid = attrs.get("data-testid") or ""
+        depth = len(self._stack)
+        self._stack.append(tag)
+
+        if self._row is None:
+            if tag == "div" and testid == "game-row":
+                self._start_row({"type": "game", "teams": [], "time": None, "odds": [], "scores": [], "links": []}, depth)
+            elif tag == "div" and DATE_CLASSES <= classes:
+                self._start_row({"type": "date", "text": ""}, depth)
+                self._capture(depth, lambda text: self._row.update(text=text))
+            return
+
+        if self._row["type"] != "game":
+            return
+        row = self._row
+        if tag == "a" and attrs.get("href"):
+            row["links"].append(urljoin(self.base_url, attrs["href"]))
+        if tag == "div" and testid == "time-item":
+            self._time_depth = depth
+        elif tag == "div" and testid.startswith("odd-container"):
+            self._odds_depth = depth
+        elif tag == "div" and "hidden" in classes and SCORE_ATTRIBUTE in attrs:
+            self._capture(depth, row["scores"].append)
+        elif tag == "p" and TEAM_CLASSES <= classes:
+            self._capture(depth, row["teams"].append)
+        elif tag == "p" and self._odds_depth is not None:
+            self._capture(depth, row["odds"].append)
+        elif tag == "p" and self._time_depth is not None and row["time"] is None:
+            self._capture(depth, lambda text: row.update(time=text))
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        while self._stack:
+            closed = self._stack.pop()
+            self._close(len(self._stack))
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        for capture in self._captures:
+            capture[2].append(data)
+
+    def _start_row(self, row, depth):
+        self._row = row
+        self._row_depth = depth
+        self.rows.append(row)
+
+    def _capture(self, depth, sink):
+        self._captures.append([depth, sink, []])
+
+    def _close(self, depth):
+        """Fin de l'élément ouvert à cette profondeur : textes capturés, zones et ligne courante"""
+        while self._captures and self._captures[-1][0] >= depth:
+            _, sink, parts = self._captures.pop()
+            # innerText : espaces et retours à la ligne du source réduits à un espace
+            sink(" ".join("".join(parts).split()))
+        if self._time_depth is not None and self._time_depth >= depth:
+            self._time_depth = None
+        if self._odds_depth is not None and self._odds_depth >= depth:
+            self._odds_depth = None
+        if self._row is not None and self._row_depth >= depth:
+            self._row = None
+            self._row_depth = None
+
+def fetch_snapshot(url, timeout=HTTP_TIMEOUT):
+    """Lignes de la page ligue sans navigateur (même format que extract_rows), FetchError sinon"""
+    response = http.request("GET", url, headers=HEADERS, timeout=urllib3.Timeout(connect=5, read=timeout))
+    if response.status != 200:
+        raise FetchError(f"HTTP {response.status}")
+
+    charset = response.headers.get("Content-Type", "").partition("charset=")[2].split(";")[0].strip() or "utf-8"
+    parser = SnapshotParser(response.url or url)
+    parser.feed(response.data.decode(charset, errors="replace"))
+    parser.close()
+
+    if not any(row["type"] == "game" for row in parser.rows):
+        raise FetchError("aucune ligne de match dans le HTML servi (page rendue côté client)")
+    return parser.rows
@@ -0,0 +1,265 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from pymongo import ReplaceOne
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+from db_setup import MATCH_DETAILS_COLLECTION
+from scraper_mongo import LEAGUES, create_driver, odd_value, remaining_time, record_odds_history, check_fence
+from metrics import DETAIL_DURATION, DETAIL_FAILURES
+
+# Étape activée après chaque job de ligues (nécessite le pool de navigateurs)
+DETAILS_ENABLED = os.getenv("SCRAPER_DETAILS", "1") == "1"
+# Pages match visitées au plus par job, et en parallèle au plus (sessions empruntées au pool)
+DETAIL_LIMIT = int(os.getenv("SCRAPER_DETAIL_LIMIT", "30"))
+DETAIL_WORKERS = int(os.getenv("SCRAPER_DETAIL_WORKERS", "2"))
+# Âge maximum d'un détail avant nouvelle visite (secondes) : à venir / en direct
+DETAIL_TTL = int(os.getenv("SCRAPER_DETAIL_TTL", "1800"))
+DETAIL_LIVE_TTL = int(os.getenv("SCRAPER_DETAIL_LIVE_TTL", "300"))
+# Délai maximum par page match (tous marchés confondus)
+DETAIL_TIMEOUT = int(os.getenv("SCRAPER_DETAIL_TIMEOUT", "60"))
+
+# Marchés lus sur la page match (fragment OddsPortal -> issues dans l'ordre des colonnes)
+MARKETS = {
+    "1x2": {"fragment": "#1X2;2", "outcomes": ["1", "X", "2"]},
+    "over-under": {"fragment": "#over-under;2;2.50;0", "outcomes": ["over", "under"], "line": 2.5},
+    "btts": {"fragment": "#bts;2", "outcomes": ["yes", "no"]},
+}
+DETAIL_MARKETS = [m for m in os.getenv("SCRAPER_DETAIL_MARKETS", ",".join(MARKETS)).split(",") if m in MARKETS]
+
+BOOKMAKER_ROW_SELECTOR = "div[data-testid='over-under-expanded-row'], div[data-testid='expanded-row']"
+BOOKMAKER_NAME_SELECTOR = "[data-testid='outrights-expanded-bookmaker-name'], a[title] p"
+BOOKMAKER_ODDS_SELECTOR = "div[data-testid^='odd-container'] p"
+
+# Photographie du tableau des bookmakers en un seul execute_script (comme la page ligue)
+BOOKMAKERS_JS = """
+const [rowSelector, nameSelector, oddsSelector] = arguments;
+return Array.from(document.querySelectorAll(rowSelector), row => {
+    const nameNode = row.querySelector(nameSelector);
+    const logo = row.querySelector("img[alt]");
+    return {
+        name: (nameNode ? nameNode.innerText : (logo ? logo.alt : "")).trim(),
+        odds: Array.from(row.querySelectorAll(oddsSelector), node => node.innerText.trim())
+    };
+});
+"""
+
+def market_summary(outcomes, bookmakers):
+    """Meilleure cote par issue, bookmaker qui la propose et marge (1/cotes - 1) sur ces meilleures cotes"""
+    best = [None] * len(outcomes)
+    best_bookmakers = [None] * len(outcomes)
+    for bookmaker in bookmakers:
+        for i, odd in enumerate(bookmaker["odds"]):
+            if odd is not None and (best[i] is None or odd > best[i]):
+                best[i], best_bookmakers[i] = odd, bookmaker["name"]
+
+    complete = all(odd for odd in best)
+    return {
+        "best": best,
+        "best_bookmakers": best_bookmakers,
+        # Négative : les meilleures cotes combinées garantissent un gain
+        "margin": round(sum(1 / odd for odd in best) - 1, 4) if complete else None
+    }
+
+def read_market(driver, outcomes, timeout, previous=None):
+    """Lignes bookmaker complètes du marché affiché ([] si le marché n'est pas proposé)
+
+    previous : une ligne du tableau affiché avant le changement de fragment, qui doit avoir disparu du DOM
+    (sinon deux marchés à 2 issues consécutifs liraient le tableau du premier)."""
+    def loaded(d):
+        if previous is not None and not EC.staleness_of(previous)(d):
+            return False
+        rows = d.execute_script(BOOKMAKERS_JS, BOOKMAKER_ROW_SELECTOR, BOOKMAKER_NAME_SELECTOR, BOOKMAKER_ODDS_SELECTOR)
+        rows = [row for row in rows or [] if row["name"] and len(row["odds"]) == len(outcomes)]
+        return rows or False
+
+    try:
+        rows = WebDriverWait(driver, timeout).until(loaded)
+    except TimeoutException:
+        return []
+
+    bookmakers = []
+    seen = set()
+    for row in rows:
+        if row["name"] in seen:
+            continue
+        seen.add(row["name"])
+        odds = [odd_value(text) for text in row["odds"]]
+        bookmakers.append({
+            "name": row["name"],
+            "odds": odds,
+            "margin": round(sum(1 / odd for odd in odds) - 1, 4) if all(odds) else None
+        })
+    return bookmakers
+
+def fetch_match_detail(driver, url, markets=None, timeout=DETAIL_TIMEOUT):
+    """Matrice bookmaker x issue de chaque marché de la page match"""
+    deadline = time.monotonic() + timeout
+    driver.set_page_load_timeout(remaining_time(deadline, timeout))
+    detail = {}
+    for name in markets or DETAIL_MARKETS:
+        market = MARKETS[name]
+        # Même page : seul le fragment change, l'application OddsPortal remplace le tableau affiché
+        previous = driver.find_elements(By.CSS_SELECTOR, BOOKMAKER_ROW_SELECTOR)
+        driver.get(url.split("#")[0] + market["fragment"])
+        bookmakers = read_market(driver, market["outcomes"], remaining_time(deadline, 15),
+                                 previous[0] if previous else None)
+        if not bookmakers:
+            continue
+        detail[name] = {
+            "outcomes": market["outcomes"],
+            "line": market.get("line"),
+            "bookmakers": bookmakers,
+            **market_summary(market["outcomes"], bookmakers)
+        }
+    return detail
+
+def is_due(match, fetched, now):
+    """Détail absent, trop ancien, ou match terminé depuis la dernière visite (cotes de clôture)"""
+    if fetched is None:
+        return True
+    if match.get("is_finished"):
+        return not fetched.get("is_finished")
+    ttl = DETAIL_LIVE_TTL if match.get("is_live") else DETAIL_TTL
+    return (now - fetched["fetched_at"]).total_seconds() >= ttl
+
+def due_matches(collection, league_ids, now, limit=DETAIL_LIMIT):
+    """Matchs à visiter (en direct puis coups d'envoi les plus proches), et clés de toutes les ligues"""
+    details = collection.database[MATCH_DETAILS_COLLECTION]
+    matches = list(collection.find(
+        {"league_id": {"$in": league_ids}},
+        {"_id": 0, "match_key": 1, "league_id": 1, "match_url": 1, "is_live": 1, "is_finished": 1, "datetime": 1}
+    ))
+    keys = [match["match_key"] for match in matches if match.get("match_key")]
+    fetched = {
+        doc["_id"]: doc
+        for doc in details.find({"_id": {"$in": keys}}, {"fetched_at": 1, "is_finished": 1})
+    }
+
+    due = [
+        match for match in matches
+        if match.get("match_key") and match.get("match_url") and is_due(match, fetched.get(match["match_key"]), now)
+    ]
+    due.sort(key=lambda m: (not m.get("is_live", False), m.get("is_finished", False), m.get("datetime", datetime.max)))
+    return due[:limit], keys
+
+def last_bookmaker_odds(details, keys):
+    """Dernières cotes 1X2 enregistrées par (match, bookmaker), lues dans les détails précédents"""
+    last = {}
+    for doc in details.find({"_id": {"$in": keys}, "markets.1x2": {"$exists": True}},
+                            {"markets.1x2.bookmakers": 1}):
+        for bookmaker in doc["markets"]["1x2"].get("bookmakers", []):
+            last[(doc["_id"], bookmaker["name"])] = bookmaker["odds"]
+    return last
+
+def record_detail_changes(collection, written):
+    """Publie dans match_changes les meilleures cotes 1X2 écrites, par ligue (lues par les workers web)"""
+    now = datetime.now()
+    docs = [
+        {"league_id": league_id, "details": details, "created_at": now}
+        for league_id, details in written.items() if details
+    ]
+    if not docs:
+        return
+    try:
+        collection.database["match_changes"].insert_many(docs, ordered=False)
+    except Exception as e:
+        print(f"[WARN] Change set des détails non enregistré: {e}")
+
+def fetch_one(match, pool, markets):
+    """Visite une page match avec une session du pool (ou une session dédiée sans pool)"""
+    driver = None
+    healthy = False
+    started = time.perf_counter()
+    try:
+        driver = pool.acquire(timeout=60) if pool else create_driver()
+        detail = fetch_match_detail(driver, match["match_url"], markets)
+        healthy = True
+        return detail
+    finally:
+        DETAIL_DURATION.observe(time.perf_counter() - started, league=match["league_id"])
+        if driver:
+            if pool:
+                pool.release(driver, broken=not healthy)
+            else:
+                driver.quit()
+
+def scrape_match_details(collection, pool=None, league_ids=None, limit=DETAIL_LIMIT,
+                         workers=DETAIL_WORKERS, markets=None, fence=None):
+    """Visite en parallèle (borné) les pages des matchs dont le détail est absent ou périmé"""
+    league_ids = list(league_ids or LEAGUES.keys())
+    details = collection.database[MATCH_DETAILS_COLLECTION]
+    now = datetime.now()
+    due, keys = due_matches(collection, league_ids, now, limit)
+    report = {"due": len(due), "fetched": 0, "empty": 0, "failed": 0}
+
+    # Détails des matchs qui ne sont plus en base
+    check_fence(fence)
+    details.delete_many({"league_id": {"$in": league_ids}, "_id": {"$nin": keys}})
+    if not due:
+        return report
+
+    workers = max(1, min(workers, pool.size if pool else 1, len(due)))
+    last_odds = last_bookmaker_odds(details, [match["match_key"] for match in due])
+    operations = []
+    odds_points = []
+    written = {}  # league_id -> match_key -> meilleures cotes 1X2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_one, match, pool, markets): match for match in due}
+        for future in as_completed(futures):
+            match = futures[future]
+            try:
+                detail = future.result()
+            except Exception as e:
+                report["failed"] += 1
+                DETAIL_FAILURES.inc(league=match["league_id"])
+                print(f"[DETAILS] Échec {match['match_key']}: {str(e)[:200]}")
+                continue
+
+            if not detail:
+                report["empty"] += 1
+            else:
+                report["fetched"] += 1
+            fetched_at = datetime.now()
+            # Enregistré même vide : la page n'est revisitée qu'après expiration
+            operations.append(ReplaceOne({"_id": match["match_key"]}, {
+                "match_key": match["match_key"],
+                "league_id": match["league_id"],
+                "match_url": match["match_url"],
+                "is_live": match.get("is_live", False),
+                "is_finished": match.get("is_finished", False),
+                "fetched_at": fetched_at,
+                "markets": detail
+            }, upsert=True))
+            if detail.get("1x2"):
+                written.setdefault(match["league_id"], {})[match["match_key"]] = {
+                    "best": detail["1x2"]["best"],
+                    "best_bookmakers": detail["1x2"]["best_bookmakers"]
+                }
+            # Historique par bookmaker du 1X2, à côté de la moyenne écrite par la page ligue (mouvements seulement)
+            for bookmaker in detail.get("1x2", {}).get("bookmakers", []):
+                if last_odds.get((match["match_key"], bookmaker["name"])) == bookmaker["odds"]:
+                    continue
+                odds_points.append({
+                    "ts": fetched_at,
+                    "meta": {"match_key": match["match_key"], "league_id": match["league_id"],
+                             "bookmaker": bookmaker["name"]},
+                    "odd_1": bookmaker["odds"][0],
+                    "odd_x": bookmaker["odds"][1],
+                    "odd_2": bookmaker["odds"][2]
+                })
+
+    if operations:
+        check_fence(fence)
+        details.bulk_write(operations, ordered=False)
+        # Publié après l'écriture : un détail n'est jamais annoncé avant d'être lisible
+        record_detail_changes(collection, written)
+    record_odds_history(collection, odds_points)
+    print(f"[DETAILS] {report['fetched']} détail(s) écrit(s), {report['empty']} sans marché, "
+          f"{report['failed']} échec(s) sur {report['due']} match(s) à visiter")
+    return report
@@ -0,0 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import UpdateOne
+
+# Séries partagées par tous les process (scraper, workers web) : chaque process y ajoute ses deltas
+METRICS_COLLECTION = "metrics"
+# Intervalle d'envoi des deltas vers MongoDB (secondes)
+FLUSH_INTERVAL = 10
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SCRAPE_BUCKETS = (1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120, 300)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+PAGE_BYTES_BUCKETS = (65536, 262144, 524288, 1048576, 2097152, 4194304, 8388608, 16777216)
+
+_lock = threading.Lock()
+# (nom, labels triés) -> deltas non encore envoyés
+_pending = {}
+_metrics = {}
+
+class Metric:
+    def __init__(self, name, help_text, kind, buckets=None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.buckets = buckets
+        _metrics[name] = self
+
+    def _delta(self, labels):
+        key = (self.name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        delta = _pending.get(key)
+        if delta is None:
+            delta = _pending[key] = {}
+        return delta
+
+class Counter(Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "counter")
+
+    def inc(self, amount=1, **labels):
+        if not amount:
+            return
+        with _lock:
+            delta = self._delta(labels)
+            delta["value"] = delta.get("value", 0) + amount
+
+class Histogram(Metric):
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, "histogram", buckets)
+
+    def observe(self, value, **labels):
+        # Compte du premier seuil atteint (cumulé à l'export) ; au-delà du dernier : seulement count
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), None)
+        with _lock:
+            delta = self._delta(labels)
+            delta["count"] = delta.get("count", 0) + 1
+            delta["sum"] = delta.get("sum", 0) + value
+            if index is not None:
+                field = f"buckets.{index}"
+                delta[field] = delta.get(field, 0) + 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+# Scraping
+SCRAPE_DURATION = Histogram("scraper_league_duration_seconds",
+                            "Durée d'un scraping de ligue, tentatives comprises", SCRAPE_BUCKETS)
+PAGE_LOAD = Histogram("scraper_page_load_seconds",
+                      "Chargement de la page ligue jusqu'à la stabilisation des lignes de match", SCRAPE_BUCKETS)
+SCRAPE_FAILURES = Counter("scraper_attempt_failures_total", "Tentatives de scraping de ligue en échec")
+ROWS_PARSED = Counter("scraper_rows_parsed_total", "Matchs extraits de la page")
+PARSE_ERRORS = Counter("scraper_parse_errors_total", "Lignes ignorées à l'analyse")
+STALE_ELEMENTS = Counter("scraper_stale_elements_total", "StaleElementReferenceException rencontrées")
+PAGE_BYTES = Histogram("scraper_page_transfer_bytes",
+                       "Octets transférés par le navigateur pour une page ligue (document et ressources)",
+                       PAGE_BYTES_BUCKETS)
+MONGO_WRITE = Histogram("scraper_mongo_write_seconds", "Durée du bulk_write d'une ligue")
+HTTP_FETCH = Histogram("scraper_http_fetch_seconds", "Récupération de la page ligue par le client HTTP")
+HTTP_FALLBACKS = Counter("scraper_http_fallbacks_total", "Ligues repassées par le navigateur après un échec HTTP")
+DETAIL_DURATION = Histogram("scraper_match_detail_seconds", "Visite d'une page match (tous marchés)", SCRAPE_BUCKETS)
+DETAIL_FAILURES = Counter("scraper_match_detail_failures_total", "Pages match en échec")
+# Paris
+BET_SETTLEMENT = Histogram("bets_settlement_seconds", "Durée d'un règlement de paris")
+BETS_SETTLED = Counter("bets_settled_total", "Paris réglés")
+# API
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Latence des requêtes HTTP par route")
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Taille des réponses HTTP par route", SIZE_BUCKETS)
+
+def series_id(name, labels):
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+def flush(collection):
+    """Envoie les deltas accumulés ($inc, un seul bulk_write), les garde en cas d'échec"""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+
+    operations = [
+        UpdateOne(
+            {"_id": series_id(name, labels)},
+            {"$inc": delta, "$setOnInsert": {"name": name, "labels": dict(labels)}},
+            upsert=True
+        )
+        for (name, labels), delta in pending.items()
+    ]
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"[METRICS] Envoi impossible, nouvel essai au prochain intervalle: {e}")
+        with _lock:
+            for key, delta in pending.items():
+                current = _pending.setdefault(key, {})
+                for field, value in delta.items():
+                    current[field] = current.get(field, 0) + value
+        return 0
+    return len(operations)
+
+def start_flusher(collection, interval=FLUSH_INTERVAL):
+    """Thread d'envoi périodique des métriques de ce process"""
+    def run():
+        while True:
+            time.sleep(interval)
+            flush(collection)
+
+    thread = threading.Thread(target=run, name="metrics-flusher", daemon=True)
+    thread.start()
+    return thread
+
+def format_labels(labels, **extra):
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in pairs.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def export(collection):
+    """Toutes les séries partagées au format texte Prometheus"""
+    series = {}
+    for doc in collection.find({}).sort("_id", 1):
+        series.setdefault(doc.get("name"), []).append(doc)
+
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for doc in series.get(name, []):
+            labels = doc.get("labels", {})
+            if metric.kind == "counter":
+                lines.append(f"{name}{format_labels(labels)} {doc.get('value', 0)}")
+                continue
+            counts = doc.get("buckets", {})
+            cumulative = 0
+            for i, bound in enumerate(metric.buckets):
+                cumulative += counts.get(str(i), 0)
+                lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {doc.get('count', 0)}")
+            lines.append(f"{name}_sum{format_labels(labels)} {doc.get('sum', 0)}")
+            lines.append(f"{name}_count{format_labels(labels)} {doc.get('count', 0)}")
+    return "\n".join(lines) + "\n"
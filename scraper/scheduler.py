@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scraper_mongo import LEAGUES
+
+# Intervalles de rafraîchissement par ligue, en secondes
+LIVE_INTERVAL = int(os.getenv("SCHEDULE_LIVE_INTERVAL", "45"))         # au moins un match en direct
+KICKOFF_INTERVAL = int(os.getenv("SCHEDULE_KICKOFF_INTERVAL", "60"))   # coup d'envoi imminent ou dépassé
+SOON_INTERVAL = int(os.getenv("SCHEDULE_SOON_INTERVAL", "300"))        # coup d'envoi dans les 3 heures
+IDLE_INTERVAL = int(os.getenv("SCHEDULE_IDLE_INTERVAL", "1800"))       # rien avant plusieurs heures
+# Intervalle de repli si l'état des ligues ne peut pas être lu
+FALLBACK_INTERVAL = 180
+
+KICKOFF_WINDOW = timedelta(minutes=15)
+SOON_WINDOW = timedelta(hours=3)
+# Un match non terminé dont le coup d'envoi est plus ancien n'est plus attendu en direct
+STALE_KICKOFF = timedelta(hours=3)
+
+def league_states(collection, now=None):
+    """Nombre de matchs en direct et prochain coup d'envoi de chaque ligue (une seule agrégation)"""
+    now = now or datetime.now()
+    pipeline = [
+        {"$match": {"is_finished": False, "datetime": {"$gte": now - STALE_KICKOFF}}},
+        {"$group": {
+            "_id": "$league_id",
+            "live": {"$sum": {"$cond": ["$is_live", 1, 0]}},
+            # $min ignore les null : seuls les matchs à venir comptent
+            "next_kickoff": {"$min": {"$cond": ["$is_live", None, "$datetime"]}}
+        }}
+    ]
+    return {doc["_id"]: doc for doc in collection.aggregate(pipeline)}
+
+def next_interval(state, now=None):
+    """Délai avant le prochain scraping d'une ligue selon ses matchs en direct et à venir"""
+    now = now or datetime.now()
+    if state is None:
+        return IDLE_INTERVAL
+    if state.get("live"):
+        return LIVE_INTERVAL
+
+    kickoff = state.get("next_kickoff")
+    if kickoff is None:
+        return IDLE_INTERVAL
+
+    until_kickoff = kickoff - now
+    if until_kickoff <= KICKOFF_WINDOW:
+        return KICKOFF_INTERVAL
+    if until_kickoff <= SOON_WINDOW:
+        # Se réveiller à l'entrée dans la fenêtre du coup d'envoi plutôt qu'après
+        return int(max(KICKOFF_INTERVAL, min(SOON_INTERVAL, (until_kickoff - KICKOFF_WINDOW).total_seconds())))
+    return int(max(SOON_INTERVAL, min(IDLE_INTERVAL, (until_kickoff - SOON_WINDOW).total_seconds())))
+
+class LeagueScheduler:
+    """Planifie le scraping de chaque ligue d'après ses matchs en direct et ses prochains coups d'envoi"""
+
+    def __init__(self, collection, worker, tick=5):
+        self.collection = collection
+        self.worker = worker
+        self.tick = tick
+        self._next_run = {league_id: time.monotonic() for league_id in LEAGUES}
+        self._intervals = {}
+        self._next_at = {}  # échéance en heure murale, pour l'affichage
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        worker.add_listener(self._on_job_done)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stopped,),
+                                            name="league-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Arrête les soumissions (perte du bail) ; start() les relance"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def reschedule(self, league_ids=None):
+        """Recalcule l'échéance des ligues à partir de l'état actuel des matchs"""
+        league_ids = list(league_ids or LEAGUES.keys())
+        now = datetime.now()
+        try:
+            states = league_states(self.collection, now)
+            intervals = {league_id: next_interval(states.get(league_id), now) for league_id in league_ids}
+        except Exception as e:
+            print(f"[SCHED] Erreur lecture de l'état des ligues: {e}")
+            intervals = {league_id: FALLBACK_INTERVAL for league_id in league_ids}
+
+        with self._lock:
+            for league_id, interval in intervals.items():
+                self._intervals[league_id] = interval
+                self._next_run[league_id] = time.monotonic() + interval
+                self._next_at[league_id] = now + timedelta(seconds=interval)
+
+        for league_id, interval in intervals.items():
+            print(f"[SCHED] {LEAGUES[league_id]['name']}: prochain scraping dans {interval:.0f}s")
+
+    def schedule(self):
+        """Échéances courantes {ligue: {interval, next_run_at, pending}}"""
+        with self._lock:
+            return {
+                league_id: {
+                    "interval": self._intervals.get(league_id),
+                    "next_run_at": self._next_at[league_id].isoformat() if league_id in self._next_at else None,
+                    "pending": next_run == float("inf")
+                }
+                for league_id, next_run in self._next_run.items()
+            }
+
+    def _run(self, stopped):
+        while not stopped.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [league_id for league_id, next_run in self._next_run.items() if next_run <= now]
+                # En attente de la fin du job : l'échéance suivante est fixée par _on_job_done
+                for league_id in due:
+                    self._next_run[league_id] = float("inf")
+
+            for league_id in due:
+                self.worker.submit(league_id)
+            stopped.wait(self.tick)
+
+    def _on_job_done(self, job):
+        # Scrapings planifiés comme manuels : l'échéance repart de la fin du job
+        self.reschedule(job.league_ids)
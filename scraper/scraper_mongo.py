@@ -1,21 +1,34 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, DeleteMany
+from pymongo.errors import BulkWriteError
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import hashlib
+import json
+import queue
+import random
+import threading
 import time
 import sys
 import traceback
+from urllib.parse import urlsplit
 
 # CONFIGURATION DU FUSEAU HORAIRE (AVANT TOUT LE RESTE)
 import os
 os.environ['TZ'] = 'Europe/Paris'
 time.tzset()
 
+from db_setup import ODDS_HISTORY_COLLECTION, ensure_odds_history, ensure_indexes, check_query_plans, bump_data_version
+from metrics import (METRICS_COLLECTION, SCRAPE_DURATION, PAGE_LOAD, SCRAPE_FAILURES, ROWS_PARSED, PARSE_ERRORS,
+                     STALE_ELEMENTS, MONGO_WRITE, HTTP_FETCH, HTTP_FALLBACKS, PAGE_BYTES, flush, start_flusher)
+from http_fetcher import HTTP_TIMEOUT, FetchError, fetch_snapshot
+
 # Configuration des ligues
 LEAGUES = {
     "ligue-1": {
@@ -45,6 +58,175 @@ LEAGUES = {
     }
 }
 
+# Pool de navigateurs : nombre de sessions Chromium gardées au chaud (0 = mode séquentiel)
+POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "3"))
+# Temps maximum alloué à une ligue (toutes tentatives confondues), en secondes
+LEAGUE_TIMEOUT = int(os.getenv("SCRAPER_LEAGUE_TIMEOUT", "120"))
+
+# Page prête : lignes, cotes et hauteur de page inchangées pendant READY_STABLE secondes (relevé toutes les READY_POLL)
+READY_STABLE = float(os.getenv("SCRAPER_READY_STABLE", "0.75"))
+READY_POLL = float(os.getenv("SCRAPER_READY_POLL", "0.25"))
+# Backoff exponentiel entre deux tentatives : 2s, 4s, 8s... (plafonné), moitié aléatoire
+RETRY_BASE_DELAY = float(os.getenv("SCRAPER_RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("SCRAPER_RETRY_MAX_DELAY", "30"))
+
+# Profil Chromium allégé : images, polices, médias et domaines tiers (pub, mesure d'audience) bloqués
+LEAN_PROFILE = os.getenv("SCRAPER_LEAN", "1") == "1"
+# Largeur gardée au-dessus du point de rupture mobile d'OddsPortal (même balisage que sur desktop)
+WINDOW_SIZE = os.getenv("SCRAPER_WINDOW_SIZE", "1280,800" if LEAN_PROFILE else "1920,1080")
+# Motifs Network.setBlockedURLs ; les feuilles de style restent chargées (innerText dépend du rendu)
+BLOCKED_EXTENSIONS = ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+                      "woff", "woff2", "ttf", "otf", "mp4", "webm"]
+BLOCKED_URLS = [
+    # Avec ou sans query string (font.woff2?v=3, comme la plupart des ressources servies par un CDN)
+    pattern for extension in BLOCKED_EXTENSIONS for pattern in (f"*.{extension}", f"*.{extension}?*")
+] + [
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*adservice.google.*", "*amazon-adsystem.com*", "*facebook.net*", "*hotjar.com*", "*criteo.*",
+    "*taboola.com*", "*outbrain.com*", "*scorecardresearch.com*", "*quantserve.com*",
+] + [pattern for pattern in os.getenv("SCRAPER_BLOCKED_URLS", "").split(",") if pattern]
+
+# Récupération de la page ligue : "selenium" par défaut, "http" (HTML servi, navigateur en secours) sur option
+FETCHER = os.getenv("SCRAPER_FETCHER", "selenium")
+# Choix par ligue : SCRAPER_FETCHERS="premier-league=selenium,ligue-1=http"
+FETCHER_OVERRIDES = dict(
+    item.split("=", 1) for item in os.getenv("SCRAPER_FETCHERS", "").split(",") if "=" in item
+)
+# Après un échec du chemin HTTP, la ligue passe directement par le navigateur pendant ce délai (secondes)
+HTTP_RETRY_AFTER = int(os.getenv("SCRAPER_HTTP_RETRY_AFTER", "1800"))
+_http_retry_at = {}
+
+def league_fetcher(league_id):
+    """Backend de récupération d'une ligue (variable par ligue, sinon configuration de la ligue, sinon défaut)"""
+    return FETCHER_OVERRIDES.get(league_id, LEAGUES.get(league_id, {}).get("fetcher", FETCHER))
+
+def use_http(league_id):
+    return league_fetcher(league_id) == "http" and time.monotonic() >= _http_retry_at.get(league_id, 0)
+
+def build_chrome_options():
+    """Options Chrome headless communes à toutes les sessions"""
+    chrome_options = Options()
+    chrome_options.binary_location = "/usr/bin/chromium"
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE}")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    if LEAN_PROFILE:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
+    return chrome_options
+
+def create_driver():
+    """Lance une nouvelle session Chromium (requêtes non essentielles bloquées en profil allégé)"""
+    driver = webdriver.Chrome(
+        service=Service("/usr/bin/chromedriver"),
+        options=build_chrome_options()
+    )
+    # Tampon Resource Timing agrandi avant chaque page : toutes les ressources comptent dans page_stats
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "performance.setResourceTimingBufferSize(2000);"
+    })
+    if LEAN_PROFILE:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    return driver
+
+def remaining_time(deadline, default):
+    """Secondes restantes avant la deadline (ou la valeur par défaut sans deadline)"""
+    if deadline is None:
+        return default
+    return max(1, min(default, deadline - time.monotonic()))
+
+def retry_delay(attempt, deadline=None):
+    """Attente avant la tentative suivante : backoff exponentiel avec jitter, borné par la deadline"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    # Jitter : les ligues en échec au même moment ne réessaient pas ensemble
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    if deadline is not None:
+        delay = min(delay, max(0, deadline - time.monotonic()))
+    return delay
+
+class FencedWrite(Exception):
+    """Écriture refusée : le process qui a lancé le scraping n'en est plus le pilote (bail perdu)"""
+
+def check_fence(fence, league_id=None):
+    """Lève FencedWrite si la barrière fournie par le pilote refuse l'écriture (sans barrière : toujours permise)"""
+    if fence is not None and not fence():
+        raise FencedWrite(f"écriture de {league_id or 'détails'} abandonnée, bail du pilote perdu")
+
+class DriverPool:
+    """Pool de sessions Chromium réutilisées entre les ligues et entre les cycles"""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def acquire(self, timeout=None):
+        """Emprunte une session libre, ou en lance une nouvelle si le pool n'est pas plein"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    return create_driver()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutException("Aucune session Chromium disponible dans le pool")
+
+            # Attente courte : une place peut aussi se libérer via une session jetée
+            try:
+                return self._idle.get(timeout=remaining_time(deadline, 1))
+            except queue.Empty:
+                continue
+
+    def release(self, driver, broken=False):
+        """Rend une session au pool, ou la ferme si elle n'est plus fiable"""
+        if broken:
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def close(self):
+        """Ferme toutes les sessions inactives du pool"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
 def parse_date(date_str):
     """Parse et normalise la date"""
     try:
@@ -73,23 +255,98 @@ def parse_date(date_str):
         print(f"[WARN] Erreur parsing date '{date_str}': {e}")
         return None
 
+def odd_value(text):
+    """Convertit une cote affichée en nombre (None pour '-' ou une valeur illisible)"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+def score_value(text):
+    """Convertit un score affiché en entier (None si vide ou illisible)"""
+    try:
+        return int(str(text).strip())
+    except (TypeError, ValueError):
+        return None
+
+def migrate_numeric_fields(collection):
+    """Migration unique : convertit les cotes et scores texte des anciens documents"""
+    to_number = lambda field, target: {
+        "$convert": {"input": f"${field}", "to": target, "onError": None, "onNull": None}
+    }
+    fields = {"odd_1": "double", "odd_x": "double", "odd_2": "double", "score_home": "int", "score_away": "int"}
+    
+    # Pipeline de mise à jour exécuté côté serveur, idempotent (seuls les champs texte sont ciblés)
+    legacy = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    league_ids = collection.distinct("league_id", legacy)
+    result = collection.update_many(
+        legacy,
+        [{"$set": {field: to_number(field, target) for field, target in fields.items()}}]
+    )
+    if result.modified_count > 0:
+        bump_league_versions(collection, league_ids)
+        print(f"[MIGRATE] {result.modified_count} match(s) converti(s) en champs numériques")
+    return result.modified_count
+
+def bump_league_versions(collection, league_ids):
+    """Nouvelle version des ligues réécrites hors scraping (caches et ETag invalidés)"""
+    for league_id in sorted(set(league_ids) - {None}):
+        bump_data_version(collection.database, league_id)
+
+def match_key(league_id, home_team, away_team, date):
+    """Clé canonique d'une rencontre, identique avant, pendant et après le match"""
+    raw = "|".join((league_id, home_team, away_team, date))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def migrate_match_keys(collection):
+    """Migration unique : pose match_key sur les anciens documents et fusionne les doublons live / terminé"""
+    legacy = list(collection.find(
+        {"match_key": {"$exists": False}},
+        {"league_id": 1, "home_team": 1, "away_team": 1, "date": 1, "scraped_at": 1}
+    ))
+    if not legacy:
+        return 0
+    
+    groups = {}
+    for doc in legacy:
+        key = match_key(doc.get("league_id", ""), doc.get("home_team", ""), doc.get("away_team", ""), doc.get("date", ""))
+        groups.setdefault(key, []).append(doc)
+    existing = set(collection.distinct("match_key", {"match_key": {"$in": list(groups)}}))
+    
+    operations = []
+    duplicates = []
+    for key, docs in groups.items():
+        # Le document le plus récent reçoit la clé, les versions plus anciennes (ex-suffixes _LIVE...) sont supprimées
+        docs.sort(key=lambda doc: doc.get("scraped_at") or datetime.min, reverse=True)
+        keep = [] if key in existing else docs[:1]
+        duplicates.extend(doc["_id"] for doc in docs[len(keep):])
+        operations.extend(UpdateOne({"_id": doc["_id"]}, {"$set": {"match_key": key}}) for doc in keep)
+    if duplicates:
+        operations.append(DeleteMany({"_id": {"$in": duplicates}}))
+    
+    collection.bulk_write(operations, ordered=False)
+    bump_league_versions(collection, [doc.get("league_id") for doc in legacy])
+    print(f"[MIGRATE] match_key posé sur {len(legacy) - len(duplicates)} match(s), {len(duplicates)} doublon(s) supprimé(s)")
+    return len(legacy)
+
 def clean_old_matches(collection, league_id=None):
     """Nettoie les matchs obsolètes de la base de données"""
     try:
-        # Supprimer les matchs terminés de plus de 24 heures
+        # Supprimer les matchs terminés qui ne sont plus affichés depuis 24 heures
+        # (date de dernier passage, pas le coup d'envoi : un résultat encore listé reste en base)
         twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
         
         query = {
             "is_finished": True,
-            "datetime": {"$lt": twenty_four_hours_ago}
+            "$or": [
+                {"last_seen_at": {"$lt": twenty_four_hours_ago}},
+                # Documents écrits avant last_seen_at
+                {"last_seen_at": {"$exists": False}, "datetime": {"$lt": twenty_four_hours_ago}}
+            ]
         }
         if league_id:
             query["league_id"] = league_id
         
-        deleted = collection.delete_many(query)
-        if deleted.deleted_count > 0:
-            print(f"[CLEAN] {deleted.deleted_count} match(s) terminé(s) de +24h supprimé(s)")
-        
         # Supprimer les matchs à venir de plus de 6 heures dans le passé
         six_hours_ago = datetime.now() - timedelta(hours=6)
         query_old = {
@@ -100,254 +357,658 @@ def clean_old_matches(collection, league_id=None):
         if league_id:
             query_old["league_id"] = league_id
         
-        deleted_old = collection.delete_many(query_old)
-        if deleted_old.deleted_count > 0:
-            print(f"[CLEAN] {deleted_old.deleted_count} match(s) obsolète(s) supprimé(s)")
+        total = 0
+        removed = {}
+        for stale_query, label in ((query, "terminé(s) de +24h"), (query_old, "obsolète(s)")):
+            # Les clés supprimées sont publiées dans le change set de leur ligue
+            stale = list(collection.find(stale_query, {"_id": 1, "league_id": 1, "match_key": 1}))
+            if not stale:
+                continue
+            
+            deleted = collection.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+            if deleted.deleted_count > 0:
+                print(f"[CLEAN] {deleted.deleted_count} match(s) {label} supprimé(s)")
+            total += deleted.deleted_count
+            
+            for doc in stale:
+                removed.setdefault(doc.get("league_id"), []).append(doc.get("match_key"))
+        
+        for stale_league, match_keys in removed.items():
+            record_changes(collection, stale_league, {"added": [], "changed": [], "removed": match_keys})
             
-        return deleted.deleted_count + deleted_old.deleted_count
+        return total
         
     except Exception as e:
         print(f"[ERROR] Erreur lors du nettoyage: {e}")
         return 0
 
-def scrape_league(league_id, league_info, collection, max_retries=3):
-    """Scrape une ligue spécifique avec retry"""
+# Sélecteurs de la page ligue OddsPortal
+GAME_ROW_SELECTOR = "div[data-testid='game-row']"
+ROW_SELECTOR = "div[data-testid='game-row'], div.text-black-main.font-main.w-full.truncate.text-xs.font-normal.leading-5"
+TEAMS_SELECTOR = "p.participant-name.truncate"
+TIME_SELECTOR = "div[data-testid='time-item'] p"
+ODDS_SELECTOR = "div[data-testid^='odd-container'] p"
+SCORES_SELECTOR = "div.hidden[data-v-143a5c06]"
+LINKS_SELECTOR = "a[href]"
+
+# Mode d'extraction : "snapshot" (un seul execute_script par page) ou "elements" (historique)
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION", "snapshot")
+
+# Photographie en un seul aller-retour WebDriver de toutes les lignes match / date de la page
+SNAPSHOT_JS = """
+const [rowSelector, teamsSelector, timeSelector, oddsSelector, scoresSelector, linksSelector] = arguments;
+const texts = (el, selector) => Array.from(el.querySelectorAll(selector), node => node.innerText.trim());
+return Array.from(document.querySelectorAll(rowSelector), el => {
+    if (el.classList.contains("text-black-main") && el.classList.contains("truncate")) {
+        return {type: "date", text: el.innerText.trim()};
+    }
+    const timeNode = el.querySelector(timeSelector);
+    return {
+        type: "game",
+        teams: texts(el, teamsSelector),
+        time: timeNode ? timeNode.innerText.trim() : null,
+        odds: texts(el, oddsSelector),
+        scores: Array.from(el.querySelectorAll(scoresSelector), node => node.textContent.trim()),
+        links: Array.from(el.querySelectorAll(linksSelector), node => node.href)
+    };
+});
+"""
+
+def extract_rows_snapshot(driver):
+    """Extrait toutes les lignes de la page en JSON via un seul execute_script"""
+    return driver.execute_script(
+        SNAPSHOT_JS, ROW_SELECTOR, TEAMS_SELECTOR, TIME_SELECTOR, ODDS_SELECTOR, SCORES_SELECTOR, LINKS_SELECTOR
+    ) or []
+
+def extract_rows_elements(driver):
+    """Extraction historique élément par élément (un aller-retour WebDriver par appel)"""
+    snapshot = []
+    for el in driver.find_elements(By.CSS_SELECTOR, ROW_SELECTOR):
+        try:
+            cls = el.get_attribute("class") or ""
+            if "text-black-main" in cls and "truncate" in cls:
+                snapshot.append({"type": "date", "text": el.text.strip()})
+                continue
+            
+            try:
+                match_time = el.find_element(By.CSS_SELECTOR, TIME_SELECTOR).text.strip()
+            except NoSuchElementException:
+                match_time = None
+            
+            snapshot.append({
+                "type": "game",
+                "teams": [t.text.strip() for t in el.find_elements(By.CSS_SELECTOR, TEAMS_SELECTOR)],
+                "time": match_time,
+                "odds": [o.text.strip() for o in el.find_elements(By.CSS_SELECTOR, ODDS_SELECTOR)],
+                "scores": [d.text.strip() for d in el.find_elements(By.CSS_SELECTOR, SCORES_SELECTOR)],
+                "links": [a.get_attribute("href") for a in el.find_elements(By.CSS_SELECTOR, LINKS_SELECTOR)]
+            })
+        except StaleElementReferenceException:
+            snapshot.append({"type": "stale"})
+    return snapshot
+
+def match_url(links):
+    """Lien de la page match parmi les liens d'une ligne (chemin sport/pays/ligue/match)"""
+    for link in links or []:
+        if link and len([part for part in urlsplit(link).path.split("/") if part]) >= 4:
+            return link.split("#")[0]
+    return None
+
+# État de la page à chaque relevé : défilement en bas (lignes chargées à la demande), puis
+# nombre de lignes match, lignes dont les cotes sont affichées et hauteur du document
+READY_JS = """
+const [rowSelector, oddsSelector] = arguments;
+window.scrollTo(0, document.body.scrollHeight);
+const rows = document.querySelectorAll(rowSelector);
+const priced = Array.from(rows).filter(
+    row => Array.from(row.querySelectorAll(oddsSelector)).some(node => node.textContent.trim())
+).length;
+return [rows.length, priced, document.body.scrollHeight];
+"""
+
+# Octets transférés (document + ressources) et durée de chargement vus par le navigateur.
+# transferSize vaut 0 pour les ressources tierces sans Timing-Allow-Origin : borne basse.
+PAGE_STATS_JS = """
+const nav = performance.getEntriesByType("navigation")[0];
+const resources = performance.getEntriesByType("resource");
+return {
+    bytes: (nav ? nav.transferSize : 0) + resources.reduce((total, entry) => total + (entry.transferSize || 0), 0),
+    resources: resources.length,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : performance.now()
+};
+"""
+
+def page_stats(driver):
+    """Octets transférés, nombre de ressources et durée de chargement de la page courante"""
+    return driver.execute_script(PAGE_STATS_JS) or {"bytes": 0, "resources": 0, "load_ms": 0}
+
+def wait_until_ready(driver, timeout):
+    """Attend que les lignes match soient présentes puis stables, renvoie leur nombre"""
+    seen = {"state": None, "since": None}
     
-    # Nettoyer les anciens matchs de cette ligue AVANT le scraping
-    print(f"[INFO] Nettoyage des anciens matchs pour {league_info['name']}...")
-    clean_old_matches(collection, league_id)
+    def stable(d):
+        state = tuple(d.execute_script(READY_JS, GAME_ROW_SELECTOR, ODDS_SELECTOR) or ())
+        now = time.monotonic()
+        if state != seen["state"]:
+            seen["state"], seen["since"] = state, now
+            return False
+        return bool(state and state[0]) and now - seen["since"] >= READY_STABLE
+    
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=READY_POLL).until(stable)
+    except TimeoutException:
+        if not seen["state"] or not seen["state"][0]:
+            raise
+        # Lignes présentes mais encore en mouvement au terme du délai : extraites en l'état
+        print(f"[WARN] Page encore en cours de chargement après {timeout}s ({seen['state'][0]} lignes)")
+    return seen["state"][0]
+
+def extract_rows(driver, mode=None):
+    """Extrait les lignes de la page selon le mode configuré"""
+    if (mode or EXTRACTION_MODE) == "elements":
+        return extract_rows_elements(driver)
+    return extract_rows_snapshot(driver)
+
+def parse_snapshot(snapshot, league_id, league_info):
+    """Transforme les lignes extraites en lignes empreintées (sans aucun appel WebDriver)
+
+    Chaque ligne ne porte que l'identité du match et les champs de l'empreinte : le document complet
+    n'est construit (complete_match) que pour les matchs nouveaux ou modifiés."""
+    # Garder trace des matchs scrapés pour cette session
+    scraped_matches = []
+    seen_matches = set()
+    rows = []
+    current_date = None
+    matches_count = 0
+    errors_count = 0
     
-    for attempt in range(max_retries):
+    for idx, item in enumerate(snapshot):
         try:
-            if attempt > 0:
-                print(f"[RETRY] Tentative {attempt + 1}/{max_retries} pour {league_info['name']}...")
-                time.sleep(5)
-            else:
-                print(f"\n[INFO] Scraping {league_info['name']}...")
+            if item.get("type") == "stale":
+                errors_count += 1
+                continue
+            
+            # Bloc date
+            if item.get("type") == "date":
+                date_text = item.get("text") or ""
+                if date_text and not any(x in date_text for x in [":", "–", "-"]) and len(date_text) > 3:
+                    parsed_date = parse_date(date_text)
+                    if parsed_date:
+                        current_date = parsed_date
+                continue
+            
+            if not current_date:
+                continue
+            
+            # Équipes
+            teams = item.get("teams") or []
+            if len(teams) < 2:
+                continue
             
-            # Options Chrome
-            chrome_options = Options()
-            chrome_options.binary_location = "/usr/bin/chromium"
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            home_team = teams[0].strip()
+            away_team = teams[1].strip()
             
-            driver = None
+            if not home_team or not away_team:
+                continue
             
+            # Heure ou statut du match
+            match_time = (item.get("time") or "").strip() or "00:00"
+            
+            # Détecter le statut du match
+            is_live = "'" in match_time or match_time.lower() == "ht"
+            is_finished = match_time.lower() in ["ft", "fin", "finished", "aet", "pen"]
+            
+            # Clé canonique : stable entre à venir, live et terminé
+            key = match_key(league_id, home_team, away_team, current_date)
+            
+            if key in seen_matches:
+                continue
+            seen_matches.add(key)
+            scraped_matches.append(key)
+            
+            # Cotes (None si non proposées)
+            odds = item.get("odds") or []
+            odd_1 = odd_value(odds[0]) if len(odds) >= 1 else None
+            odd_x = odd_value(odds[1]) if len(odds) >= 2 else None
+            odd_2 = odd_value(odds[2]) if len(odds) >= 3 else None
+            
+            # Scores (None tant qu'ils ne sont pas connus)
+            score_home = None
+            score_away = None
+            
+            scores = item.get("scores") or []
+            if len(scores) >= 2:
+                score_home = score_value(scores[0])
+                score_away = score_value(scores[1])
+            
+            match_data = {
+                "league_id": league_id,
+                "home_team": home_team,
+                "away_team": away_team,
+                "date": current_date,
+                "time": match_time,
+                "odd_1": odd_1,
+                "odd_x": odd_x,
+                "odd_2": odd_2,
+                "score_home": score_home,
+                "score_away": score_away,
+                "is_live": is_live,
+                "is_finished": is_finished,
+                "match_key": key,
+                "match_url": match_url(item.get("links"))
+            }
+            match_data["fingerprint"] = match_fingerprint(match_data)
+            
+            # Mise à jour ou insertion par clé canonique (écrite plus tard en un seul lot)
+            rows.append(({"match_key": key}, match_data))
+            
+            matches_count += 1
+            
+        except Exception as e:
+            errors_count += 1
+            if errors_count <= 3:
+                print(f"[WARN] Erreur sur un match (élément {idx}): {str(e)[:100]}")
+            continue
+    
+    return rows, scraped_matches, matches_count, errors_count
+
+def empty_report(league_id):
+    """Rapport d'écriture d'une ligue (aussi renvoyé tel quel en cas d'échec)"""
+    return {
+        "league_id": league_id,
+        "matches": 0,
+        "errors": 0,
+        "inserted": 0,
+        "modified": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        # finished : matchs passés à l'état terminé, ou terminés dont le score a changé (règlement des paris)
+        "changes": {"added": [], "changed": [], "removed": [], "finished": []},
+        "version": None
+    }
+
+# Champs dont un changement justifie une écriture (l'heure sert de chrono pour les matchs live,
+# le lien de la page match alimente l'étape de détail par bookmaker)
+FINGERPRINT_FIELDS = ("time", "odd_1", "odd_x", "odd_2", "score_home", "score_away", "is_live", "is_finished",
+                      "match_url")
+
+def match_fingerprint(match_data):
+    """Empreinte du contenu affiché d'un match (cotes, score, statut)"""
+    payload = json.dumps([match_data.get(field) for field in FINGERPRINT_FIELDS], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def complete_match(match_data, league_info=None):
+    """Document complet d'un match à écrire (libellés de la ligue, match_id, datetime de tri, horodatage)"""
+    league_id = match_data["league_id"]
+    league_info = league_info or LEAGUES.get(league_id, {})
+    prefix = f"{league_id}_{match_data['home_team']}_{match_data['away_team']}_{match_data['date']}"
+    
+    # Match ID lisible (suffixe selon le statut)
+    if match_data["is_live"]:
+        match_id = f"{prefix}_LIVE"
+    elif match_data["is_finished"]:
+        match_id = f"{prefix}_FINISHED"
+    else:
+        match_id = f"{prefix}_{match_data['time']}"
+    
+    # Datetime pour tri
+    try:
+        if match_data["is_live"]:
+            match_datetime = datetime.now()
+        else:
+            match_datetime = datetime.strptime(f"{match_data['date']} {match_data['time']}", "%d %b %Y %H:%M")
+    except ValueError:
+        match_datetime = datetime.now()
+    
+    now = datetime.now()
+    match_data.update({
+        "league_name": league_info.get("name"),
+        "country": league_info.get("country"),
+        "datetime": match_datetime,
+        "match_id": match_id,
+        "scraped_at": now
+    })
+    if match_data["is_finished"]:
+        match_data["last_seen_at"] = now
+    return match_data
+
+def record_odds_history(collection, points):
+    """Ajoute les mouvements de cotes observés à la collection time-series"""
+    if not points:
+        return
+    try:
+        db = collection.database
+        ensure_odds_history(db)
+        db[ODDS_HISTORY_COLLECTION].insert_many(points, ordered=False)
+    except Exception as e:
+        print(f"[WARN] Historique des cotes non enregistré: {e}")
+
+# Champs diffusés aux clients pour patcher une ligne de match sans tout recharger
+CHANGE_ROW_FIELDS = ("match_key", "match_id", "home_team", "away_team", "date", "time",
+                     "odd_1", "odd_x", "odd_2", "score_home", "score_away", "is_live", "is_finished")
+
+def change_row(match_data):
+    """Vue compacte d'un match pour le change set"""
+    return {field: match_data.get(field) for field in CHANGE_ROW_FIELDS}
+
+def record_changes(collection, league_id, changes, rows=None):
+    """Publie le change set d'une ligue dans match_changes et renvoie la nouvelle version de la ligue"""
+    if not any(changes.values()):
+        return None
+    try:
+        db = collection.database
+        version = bump_data_version(db, league_id)
+        db["match_changes"].insert_one({
+            "league_id": league_id,
+            "version": version,
+            **changes,
+            "rows": rows or [],
+            "created_at": datetime.now()
+        })
+        return version
+    except Exception as e:
+        print(f"[WARN] Change set non enregistré pour {league_id}: {e}")
+        return None
+
+# Fréquence de mise à jour de last_seen_at des matchs terminés encore listés (nettoyage des +24h)
+LAST_SEEN_REFRESH = timedelta(hours=1)
+
+def write_league_matches(collection, league_id, rows, scraped_matches, fence=None):
+    """Écrit en un seul bulk_write non ordonné les seuls matchs nouveaux ou modifiés (+ nettoyage)"""
+    report = empty_report(league_id)
+    changes = report["changes"]
+    
+    # Empreintes et cotes déjà en base pour cette ligue (une seule requête, projection minimale)
+    known = {
+        doc["match_key"]: doc
+        for doc in collection.find(
+            {"league_id": league_id},
+            {"_id": 0, "match_key": 1, "fingerprint": 1, "odd_1": 1, "odd_x": 1, "odd_2": 1, "is_finished": 1,
+             "score_home": 1, "score_away": 1}
+        )
+        if doc.get("match_key")
+    }
+    
+    operations = []
+    odds_points = []
+    changed_rows = []
+    skipped = 0
+    for query, data in rows:
+        # Empreinte calculée à l'analyse : les lignes inchangées ne deviennent jamais des documents
+        previous = known.get(data["match_key"])
+        if previous is None:
+            changes["added"].append(data["match_key"])
+        elif previous.get("fingerprint") != data["fingerprint"]:
+            changes["changed"].append(data["match_key"])
+        else:
+            skipped += 1
+            continue
+        complete_match(data)
+        operations.append(UpdateOne(
+            query,
+            {"$set": data, "$setOnInsert": {"first_seen_at": data["scraped_at"]}},
+            upsert=True
+        ))
+        changed_rows.append(change_row(data))
+        # Score lu après le passage à FT, ou corrigé ensuite : les paris sont réexaminés
+        previous = previous or {}
+        score_changed = (data["score_home"], data["score_away"]) != (previous.get("score_home"), previous.get("score_away"))
+        if data["is_finished"] and (not previous.get("is_finished") or score_changed):
+            changes["finished"].append(data["match_key"])
+        
+        # Un point d'historique uniquement quand les cotes elles-mêmes bougent
+        odds = [odd_value(data[field]) for field in ("odd_1", "odd_x", "odd_2")]
+        previous_odds = [odd_value((previous or {}).get(field)) for field in ("odd_1", "odd_x", "odd_2")]
+        if any(odd is not None for odd in odds) and odds != previous_odds:
+            odds_points.append({
+                "ts": data["scraped_at"],
+                "meta": {"match_key": data["match_key"], "league_id": league_id, "bookmaker": "average"},
+                "odd_1": odds[0],
+                "odd_x": odds[1],
+                "odd_2": odds[2]
+            })
+    
+    if scraped_matches:
+        scraped = set(scraped_matches)
+        changes["removed"] = [key for key in known if key not in scraped]
+    
+    if changes["removed"]:
+        # Les upserts posent tous une clé de scraped_matches : l'ordre d'exécution est sans effet
+        operations.append(DeleteMany({
+            "league_id": league_id,
+            "match_key": {"$nin": scraped_matches}
+        }))
+    
+    report["unchanged"] = skipped
+    # Résultats encore affichés mais inchangés : date de passage rafraîchie au plus une fois par heure
+    seen_finished = [data["match_key"] for _, data in rows if data["is_finished"]]
+    if seen_finished:
+        check_fence(fence, league_id)
+        now = datetime.now()
+        collection.update_many(
+            {"match_key": {"$in": seen_finished}, "last_seen_at": {"$not": {"$gte": now - LAST_SEEN_REFRESH}}},
+            {"$set": {"last_seen_at": now}}
+        )
+    if not operations:
+        return report
+    
+    # Vérifiée au plus près de l'écriture : un ancien pilote n'écrit plus une fois le bail repris
+    # (le change set suit toujours un bulk_write appliqué, pour que les versions restent justes)
+    check_fence(fence, league_id)
+    try:
+        with MONGO_WRITE.time(league=league_id):
+            result = collection.bulk_write(operations, ordered=False)
+        inserted, matched = result.upserted_count, result.matched_count
+        modified, deleted = result.modified_count, result.deleted_count
+    except BulkWriteError as e:
+        # En mode non ordonné, les opérations valides sont appliquées malgré l'erreur
+        details = e.details
+        print(f"[WARN] {len(details.get('writeErrors', []))} erreur(s) d'écriture pour {league_id}")
+        inserted, matched = details.get("nUpserted", 0), details.get("nMatched", 0)
+        modified, deleted = details.get("nModified", 0), details.get("nRemoved", 0)
+    
+    report["inserted"] = inserted
+    report["modified"] = modified
+    report["unchanged"] += matched - modified
+    report["deleted"] = deleted
+    
+    record_odds_history(collection, odds_points)
+    report["version"] = record_changes(collection, league_id, changes, changed_rows)
+    return report
+
+def read_snapshot(snapshot, league_id, league_info, require_matches=False):
+    """Analyse les lignes extraites (navigateur ou HTTP), sans rien écrire"""
+    parsed = parse_snapshot(snapshot, league_id, league_info)
+    matches_count, errors_count = parsed[2], parsed[3]
+    ROWS_PARSED.inc(matches_count, league=league_id)
+    PARSE_ERRORS.inc(errors_count, league=league_id)
+    STALE_ELEMENTS.inc(len([item for item in snapshot if item.get("type") == "stale"]), league=league_id)
+    if require_matches and not matches_count:
+        raise FetchError("aucun match exploitable dans les lignes extraites")
+    return parsed
+
+def store_snapshot(collection, league_id, league_info, parsed, fence=None):
+    """Écrit les lignes analysées par read_snapshot, renvoie le rapport de la ligue"""
+    rows, scraped_matches, matches_count, errors_count = parsed
+    
+    # Upserts + suppression des matchs qui ne sont plus sur OddsPortal, en un seul lot
+    report = write_league_matches(collection, league_id, rows, scraped_matches, fence)
+    report.update({"matches": matches_count, "errors": errors_count})
+    
+    print(f"[OK] {league_info['name']}: {matches_count} matchs scrapés ({errors_count} erreurs ignorées)")
+    print(f"[WRITE] {league_info['name']}: {report['inserted']} inséré(s), {report['modified']} modifié(s), "
+          f"{report['unchanged']} inchangé(s), {report['deleted']} supprimé(s)")
+    changes = report["changes"]
+    print(f"[CHANGES] {league_info['name']}: +{len(changes['added'])} ~{len(changes['changed'])} -{len(changes['removed'])}")
+    return report
+
+def scrape_league(league_id, league_info, collection, max_retries=3, pool=None, timeout=None, fence=None):
+    """Scrape une ligue spécifique avec retry (session empruntée au pool si fourni)
+
+    fence : fonction appelée avant chaque écriture, False si ce process ne pilote plus le scraping."""
+    deadline = time.monotonic() + timeout if timeout else None
+    
+    # Nettoyer les anciens matchs de cette ligue AVANT le scraping
+    check_fence(fence, league_id)
+    print(f"[INFO] Nettoyage des anciens matchs pour {league_info['name']}...")
+    clean_old_matches(collection, league_id)
+    
+    started = time.perf_counter()
+    try:
+        # Chemin léger : HTML servi via le client HTTP partagé, sans navigateur
+        if use_http(league_id):
+            parsed = None
             try:
-                driver = webdriver.Chrome(
-                    service=Service("/usr/bin/chromedriver"),
-                    options=chrome_options
-                )
-                
-                driver.get(league_info['url'])
-                
-                # Attendre le chargement
+                print(f"\n[HTTP] Scraping {league_info['name']} sans navigateur...")
+                fetch_started = time.perf_counter()
+                snapshot = fetch_snapshot(league_info['url'], timeout=remaining_time(deadline, HTTP_TIMEOUT))
+                HTTP_FETCH.observe(time.perf_counter() - fetch_started, league=league_id)
+                parsed = read_snapshot(snapshot, league_id, league_info, require_matches=True)
+            except Exception as e:
+                _http_retry_at[league_id] = time.monotonic() + HTTP_RETRY_AFTER
+                HTTP_FALLBACKS.inc(league=league_id)
+                print(f"[HTTP] {league_info['name']}: {str(e)[:200]}, passage au navigateur")
+            
+            if parsed is not None:
+                # Hors du try : une erreur d'écriture n'est ni un échec HTTP ni une raison de repasser par le navigateur
                 try:
-                    WebDriverWait(driver, 30).until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, "div[data-testid='game-row']")
-                        )
-                    )
-                except TimeoutException:
-                    print(f"[WARN] Timeout lors du chargement de {league_info['name']}, réessai...")
+                    return store_snapshot(collection, league_id, league_info, parsed, fence=fence)
+                except FencedWrite:
                     raise
+                except Exception as e:
+                    SCRAPE_FAILURES.inc(league=league_id)
+                    print(f"[ERROR] Écriture de {league_info['name']} impossible: {str(e)[:200]}")
+                    return empty_report(league_id)
+        
+        for attempt in range(max_retries):
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"[FAIL] {league_info['name']}: délai de {timeout}s dépassé")
+                return empty_report(league_id)
+            
+            try:
+                if attempt > 0:
+                    delay = retry_delay(attempt, deadline)
+                    print(f"[RETRY] Tentative {attempt + 1}/{max_retries} pour {league_info['name']} dans {delay:.1f}s...")
+                    time.sleep(delay)
+                else:
+                    print(f"\n[INFO] Scraping {league_info['name']}...")
                 
-                time.sleep(3)
-                
-                # Scroll pour charger tout le contenu
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
-                
-                elements = driver.find_elements(
-                    By.CSS_SELECTOR,
-                    "div[data-testid='game-row'], div.text-black-main.font-main.w-full.truncate.text-xs.font-normal.leading-5"
-                )
-                
-                if not elements:
-                    print(f"[WARN] Aucun élément trouvé pour {league_info['name']}")
-                    raise Exception("Aucun match trouvé")
-                
-                # Garder trace des matchs scrapés pour cette session
-                scraped_matches = []
-                seen_matches = set()
-                current_date = None
-                matches_count = 0
-                errors_count = 0
+                driver = None
+                healthy = False
                 
-                for idx, el in enumerate(elements):
+                try:
+                    if pool:
+                        driver = pool.acquire(timeout=remaining_time(deadline, 60))
+                    else:
+                        driver = create_driver()
+                    
+                    driver.set_page_load_timeout(remaining_time(deadline, 300))
+                    load_started = time.perf_counter()
+                    driver.get(league_info['url'])
+                    
+                    # Attendre que les lignes (y compris celles chargées au défilement) ne bougent plus
                     try:
-                        cls = el.get_attribute("class") or ""
-                        
-                        # Bloc date
-                        if "text-black-main" in cls and "truncate" in cls:
-                            date_text = el.text.strip()
-                            if date_text and not any(x in date_text for x in [":", "–", "-"]) and len(date_text) > 3:
-                                parsed_date = parse_date(date_text)
-                                if parsed_date:
-                                    current_date = parsed_date
-                            continue
-                        
-                        if not current_date:
-                            continue
-                        
-                        # Équipes
-                        teams = el.find_elements(By.CSS_SELECTOR, "p.participant-name.truncate")
-                        if len(teams) < 2:
-                            continue
-                        
-                        home_team = teams[0].text.strip()
-                        away_team = teams[1].text.strip()
-                        
-                        if not home_team or not away_team:
-                            continue
-                        
-                        # Heure ou statut du match
-                        try:
-                            time_element = el.find_element(By.CSS_SELECTOR, "div[data-testid='time-item'] p")
-                            match_time = time_element.text.strip()
-                        except:
-                            match_time = "00:00"
-                        
-                        # Détecter le statut du match
-                        is_live = "'" in match_time or match_time.lower() == "ht"
-                        is_finished = match_time.lower() in ["ft", "fin", "finished", "aet", "pen"]
-                        
-                        
-                        # Match ID unique
-                        # Match ID unique
-                        if is_live:
-                            match_id = f"{league_id}_{home_team}_{away_team}_{current_date}_LIVE"
-                        elif is_finished:
-                            match_id = f"{league_id}_{home_team}_{away_team}_{current_date}_FINISHED"
-                        else:
-                            match_id = f"{league_id}_{home_team}_{away_team}_{current_date}_{match_time}"
-                        
-                        if match_id in seen_matches:
-                            continue
-                        seen_matches.add(match_id)
-                        scraped_matches.append(match_id)
-                        
-                        # Cotes
-                        try:
-                            odds_elements = el.find_elements(By.CSS_SELECTOR, "div[data-testid^='odd-container'] p")
-                            odd_1 = odds_elements[0].text.strip() if len(odds_elements) >= 1 else "-"
-                            odd_x = odds_elements[1].text.strip() if len(odds_elements) >= 2 else "-"
-                            odd_2 = odds_elements[2].text.strip() if len(odds_elements) >= 3 else "-"
-                        except:
-                            odd_1 = odd_x = odd_2 = "-"
-                        
-                        # Scores
-                        score_home = "0"
-                        score_away = "0"
-                        
-                        try:
-                            score_divs = el.find_elements(By.CSS_SELECTOR, "div.hidden[data-v-143a5c06]")
-                            if len(score_divs) >= 2:
-                                score_home = score_divs[0].text.strip() if score_divs[0].text.strip() else "0"
-                                score_away = score_divs[1].text.strip() if score_divs[1].text.strip() else "0"
-                        except:
-                            pass
-                        
-                        # Datetime pour tri
-                        try:
-                            if is_live:
-                                match_datetime = datetime.now()
-                            else:
-                                match_datetime = datetime.strptime(f"{current_date} {match_time}", "%d %b %Y %H:%M")
-                        except:
-                            match_datetime = datetime.now()
-                        
-                        match_data = {
-                            "league_id": league_id,
-                            "league_name": league_info['name'],
-                            "country": league_info['country'],
-                            "home_team": home_team,
-                            "away_team": away_team,
-                            "date": current_date,
-                            "time": match_time,
-                            "odd_1": odd_1,
-                            "odd_x": odd_x,
-                            "odd_2": odd_2,
-                            "score_home": score_home,
-                            "score_away": score_away,
-                            "datetime": match_datetime,
-                            "is_live": is_live,
-                            "is_finished": is_finished,
-                            "match_id": match_id,
-                            "scraped_at": datetime.now()
-                        }
-                        
-                        # Mise à jour ou insertion
-                        if is_live or is_finished:
-                            # Pour live et terminés : match par équipes + date
-                            collection.update_one(
-                                {
-                                    "league_id": league_id,
-                                    "home_team": home_team,
-                                    "away_team": away_team,
-                                    "date": current_date
-                                },
-                                {"$set": match_data},
-                                upsert=True
-                            )
+                        wait_until_ready(driver, remaining_time(deadline, 30))
+                    except TimeoutException:
+                        print(f"[WARN] Timeout lors du chargement de {league_info['name']}, réessai...")
+                        raise
+                    PAGE_LOAD.observe(time.perf_counter() - load_started, league=league_id)
+                    stats = page_stats(driver)
+                    PAGE_BYTES.observe(stats["bytes"], league=league_id)
+                    print(f"[PAGE] {league_info['name']}: {stats['bytes'] / 1024:.0f} Ko transférés "
+                          f"({stats['resources']} ressources), chargée en {stats['load_ms'] / 1000:.1f}s, "
+                          f"prête en {time.perf_counter() - load_started:.1f}s")
+                    
+                    snapshot = extract_rows(driver)
+                    
+                    if not snapshot:
+                        print(f"[WARN] Aucun élément trouvé pour {league_info['name']}")
+                        raise Exception("Aucun match trouvé")
+                    
+                    parsed = read_snapshot(snapshot, league_id, league_info)
+                    report = store_snapshot(collection, league_id, league_info, parsed, fence=fence)
+                    healthy = True
+                    return report
+                    
+                finally:
+                    if driver:
+                        if pool:
+                            # Une session en échec est relancée plutôt que réutilisée
+                            pool.release(driver, broken=not healthy)
                         else:
-                            # Pour à venir : match par équipes + date + heure
-                            collection.update_one(
-                                {
-                                    "league_id": league_id,
-                                    "home_team": home_team,
-                                    "away_team": away_team,
-                                    "date": current_date,
-                                    "time": match_time
-                                },
-                                {"$set": match_data},
-                                upsert=True
-                            )
-                        
-                        matches_count += 1
+                            driver.quit()
                         
-                    except StaleElementReferenceException:
-                        errors_count += 1
-                        continue
-                    except Exception as e:
-                        errors_count += 1
-                        if errors_count <= 3:
-                            print(f"[WARN] Erreur sur un match (élément {idx}): {str(e)[:100]}")
-                        continue
-                
-                # IMPORTANT: Supprimer les matchs qui ne sont plus sur OddsPortal
-                # (ceux qui ne sont pas dans scraped_matches)
-                if scraped_matches:
-                    deleted_obsolete = collection.delete_many({
-                        "league_id": league_id,
-                        "match_id": {"$nin": scraped_matches}
-                    })
-                    if deleted_obsolete.deleted_count > 0:
-                        print(f"[CLEAN] {deleted_obsolete.deleted_count} match(s) obsolète(s) supprimé(s)")
-                
-                print(f"[OK] {league_info['name']}: {matches_count} matchs scrapés ({errors_count} erreurs ignorées)")
-                return matches_count
-                
-            finally:
-                if driver:
-                    driver.quit()
-                    
-        except Exception as e:
-            print(f"[ERROR] Tentative {attempt + 1} échouée pour {league_info['name']}: {str(e)[:200]}")
-            if attempt == max_retries - 1:
-                print(f"[FAIL] Impossible de scraper {league_info['name']} après {max_retries} tentatives")
-                traceback.print_exc()
-                return 0
-            continue
+            except FencedWrite:
+                raise
+            except Exception as e:
+                SCRAPE_FAILURES.inc(league=league_id)
+                if isinstance(e, StaleElementReferenceException):
+                    STALE_ELEMENTS.inc(league=league_id)
+                print(f"[ERROR] Tentative {attempt + 1} échouée pour {league_info['name']}: {str(e)[:200]}")
+                if attempt == max_retries - 1:
+                    print(f"[FAIL] Impossible de scraper {league_info['name']} après {max_retries} tentatives")
+                    traceback.print_exc()
+                    return empty_report(league_id)
+                continue
+        
+        return empty_report(league_id)
+    finally:
+        SCRAPE_DURATION.observe(time.perf_counter() - started, league=league_id)
+
+def scrape_all_leagues(collection, pool=None, league_ids=None, league_timeout=LEAGUE_TIMEOUT, league_locks=None,
+                       fence=None):
+    """Scrape plusieurs ligues, en parallèle sur le pool de navigateurs s'il est fourni"""
+    league_ids = list(league_ids or LEAGUES.keys())
+    results = {}
+    
+    def run(league_id, **kwargs):
+        lock = (league_locks or {}).get(league_id)
+        try:
+            if lock is None:
+                return scrape_league(league_id, LEAGUES[league_id], collection, fence=fence, **kwargs)
+            # Jamais deux écritures de la même ligue en même temps dans ce process (bulk_write, DeleteMany $nin,
+            # change set) ; entre process, la barrière du bail écarte l'ancien pilote
+            with lock:
+                return scrape_league(league_id, LEAGUES[league_id], collection, fence=fence, **kwargs)
+        except FencedWrite as e:
+            print(f"[LEASE] {LEAGUES[league_id]['name']}: {e}")
+            return empty_report(league_id)
+    
+    if pool is None:
+        for league_id in league_ids:
+            results[league_id] = run(league_id)
+        return results
     
-    return 0
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = {
+            executor.submit(run, league_id, pool=pool, timeout=league_timeout): league_id
+            for league_id in league_ids
+        }
+        for future in as_completed(futures):
+            league_id = futures[future]
+            try:
+                results[league_id] = future.result()
+            except Exception as e:
+                print(f"[ERROR] {LEAGUES[league_id]['name']}: {str(e)[:200]}")
+                results[league_id] = empty_report(league_id)
+    
+    return results
 
 def main():
+    parser = argparse.ArgumentParser(description="Scraper OddsPortal -> MongoDB")
+    parser.add_argument("league", nargs="?", help="Ligue à scraper (toutes par défaut)")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE,
+                        help="Sessions Chromium en parallèle (0 = mode séquentiel)")
+    parser.add_argument("--league-timeout", type=int, default=LEAGUE_TIMEOUT,
+                        help="Délai maximum par ligue en secondes")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="Relancer un cycle toutes les N secondes en gardant le pool (0 = un seul cycle)")
+    parser.add_argument("--details", action="store_true",
+                        help="Visiter aussi les pages match (cotes par bookmaker) après chaque cycle")
+    parser.add_argument("--migrate-types", action="store_true",
+                        help="Convertir les cotes/scores texte existants en nombres puis quitter")
+    args = parser.parse_args()
+    
     # Connexion MongoDB
     try:
         client = MongoClient("mongodb://mongodb:27017", serverSelectionTimeoutMS=5000)
@@ -361,35 +1022,65 @@ def main():
         print(f"[FAIL] Impossible de se connecter à MongoDB: {e}")
         sys.exit(1)
     
+    # Index des requêtes chaudes (idempotent) + alerte si l'une d'elles reste en COLLSCAN
+    ensure_indexes(db)
+    check_query_plans(db)
+    
+    # Métriques envoyées à la collection partagée, exportées par l'application web (/metrics)
+    metrics_collection = db[METRICS_COLLECTION]
+    start_flusher(metrics_collection)
+    
+    # Anciens documents identifiés par match_id (sans effet si déjà migrés)
+    migrate_match_keys(collection)
+    
+    if args.migrate_types:
+        migrate_numeric_fields(collection)
+        return
+    
     # Récupérer la ligue à scraper depuis les arguments
-    if len(sys.argv) > 1:
-        league_id = sys.argv[1]
+    if args.league:
+        league_id = args.league
         if league_id in LEAGUES:
             scrape_league(league_id, LEAGUES[league_id], collection)
+            flush(metrics_collection)
         else:
             print(f"[ERROR] Ligue inconnue: {league_id}")
             print(f"Ligues disponibles: {', '.join(LEAGUES.keys())}")
     else:
         # Scraper toutes les ligues
-        print("[INFO] Scraping de toutes les ligues...")
-        
-        # Nettoyage global avant de commencer
-        print("[INFO] Nettoyage global de la base de données...")
-        clean_old_matches(collection)
-        
-        total = 0
-        failed = []
-        
-        for league_id, league_info in LEAGUES.items():
-            count = scrape_league(league_id, league_info, collection)
-            total += count
-            if count == 0:
-                failed.append(league_info['name'])
-            time.sleep(3)
+        pool = DriverPool(args.pool_size) if args.pool_size > 0 else None
+        if pool:
+            print(f"[INFO] Mode parallèle: {pool.size} session(s) Chromium")
         
-        print(f"\n[OK] Total: {total} matchs scrapés")
-        if failed:
-            print(f"[WARN] Ligues échouées: {', '.join(failed)}")
+        try:
+            while True:
+                print("[INFO] Scraping de toutes les ligues...")
+                
+                # Nettoyage global avant de commencer
+                print("[INFO] Nettoyage global de la base de données...")
+                clean_old_matches(collection)
+                
+                started = time.monotonic()
+                results = scrape_all_leagues(collection, pool, league_timeout=args.league_timeout)
+                total = sum(report["matches"] for report in results.values())
+                failed = [LEAGUES[lid]['name'] for lid, report in results.items() if report["matches"] == 0]
+                
+                print(f"\n[OK] Total: {total} matchs scrapés en {time.monotonic() - started:.1f}s")
+                if failed:
+                    print(f"[WARN] Ligues échouées: {', '.join(failed)}")
+                
+                if args.details:
+                    # Import différé : match_details s'appuie sur ce module
+                    from match_details import scrape_match_details
+                    scrape_match_details(collection, pool)
+                
+                if args.interval <= 0:
+                    break
+                time.sleep(args.interval)
+        finally:
+            if pool:
+                pool.close()
+            flush(metrics_collection)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
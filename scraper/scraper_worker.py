@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from scraper_mongo import LEAGUES, POOL_SIZE, LEAGUE_TIMEOUT, DriverPool, scrape_all_leagues
+from match_details import DETAILS_ENABLED, scrape_match_details
+
+# Clé de job pour un scraping complet
+ALL_LEAGUES = "all"
+# Préfixe des jobs de pages match (un par job de ligues terminé)
+DETAILS_PREFIX = "details:"
+# Nombre maximum de jobs exécutés en même temps (plafond global, toutes ligues confondues)
+CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", str(max(POOL_SIZE, 1))))
+
+class ScrapeJob:
+    """Demande de scraping (une ligue ou toutes), partagée entre les demandeurs identiques"""
+
+    def __init__(self, key, league_ids, kind="leagues"):
+        self.key = key
+        self.league_ids = league_ids
+        # leagues : pages ligue ; details : pages match des mêmes ligues
+        self.kind = kind
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.results = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def running(self):
+        return self.started_at is not None and not self._done.is_set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Attend la fin du job, renvoie False si le délai est dépassé"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "kind": self.kind,
+            "leagues": self.league_ids,
+            "state": "done" if self.done else ("running" if self.running else "pending"),
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "results": self.results,
+            "error": self.error
+        }
+
+class ScraperWorker:
+    """Service de scraping longue durée : file de jobs dédupliqués + pool de navigateurs"""
+
+    def __init__(self, collection, pool_size=POOL_SIZE, league_timeout=LEAGUE_TIMEOUT, concurrency=CONCURRENCY,
+                 fence=None):
+        self.collection = collection
+        # Vérifie avant chaque écriture que ce process détient toujours le bail du pilote (None : toujours)
+        self.fence = fence
+        self.pool = DriverPool(pool_size) if pool_size > 0 else None
+        self.league_timeout = league_timeout
+        # Sans pool, les navigateurs ne sont pas partagés : un seul job à la fois
+        self.concurrency = max(1, concurrency) if self.pool else 1
+        self._queue = queue.Queue()
+        self._jobs = {}  # clé -> job en attente ou en cours
+        # Un job "all" et un job d'une ligue peuvent tourner ensemble : la ligue commune est sérialisée
+        self._league_locks = {league_id: threading.Lock() for league_id in LEAGUES}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        if not self._threads:
+            # Nouvel événement d'arrêt : les threads d'une génération arrêtée finissent leur job puis sortent
+            self._stopping = threading.Event()
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._run, args=(self._stopping,),
+                                          name=f"scraper-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def add_listener(self, callback):
+        """Enregistre une fonction appelée avec chaque job de ligues terminé"""
+        self._listeners.append(callback)
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._jobs)
+
+    def active_jobs(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def submit(self, league_id=None):
+        """Ajoute un job, ou renvoie le job identique déjà en attente / en cours"""
+        key = league_id or ALL_LEAGUES
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+
+            # Une ligue est déjà couverte par un scraping complet pas encore démarré
+            full = self._jobs.get(ALL_LEAGUES)
+            if full is not None and not full.running:
+                return full
+
+            league_ids = [league_id] if league_id else list(LEAGUES.keys())
+            job = ScrapeJob(key, league_ids)
+            self._jobs[key] = job
+            self._queue.put(job)
+            return job
+
+    def submit_details(self, job):
+        """Ajoute le job de pages match qui suit un job de ligues (dédupliqué comme submit)"""
+        key = DETAILS_PREFIX + job.key
+        with self._lock:
+            if key not in self._jobs:
+                details = ScrapeJob(key, job.league_ids, kind="details")
+                self._jobs[key] = details
+                self._queue.put(details)
+            return self._jobs[key]
+
+    def _cancel(self, job, reason):
+        job.error = reason
+        job.finished_at = datetime.now()
+        with self._lock:
+            self._jobs.pop(job.key, None)
+        job._done.set()
+
+    def _run(self, stopping):
+        while not stopping.is_set():
+            try:
+                job = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if stopping.is_set():
+                self._cancel(job, "Service de scraping arrêté")
+                break
+            job.started_at = datetime.now()
+            started = time.monotonic()
+            # Un job d'une génération arrêtée n'écrit plus, même si ce process reprend le bail entre-temps
+            fence = lambda stopping=stopping: not stopping.is_set() and (self.fence is None or self.fence())
+            print(f"[WORKER] Job {job.key} démarré ({len(job.league_ids)} ligue(s))", flush=True)
+
+            try:
+                if job.kind == "details":
+                    job.results = scrape_match_details(self.collection, self.pool, league_ids=job.league_ids,
+                                                       fence=fence)
+                else:
+                    job.results = scrape_all_leagues(
+                        self.collection, self.pool,
+                        league_ids=job.league_ids,
+                        league_timeout=self.league_timeout,
+                        league_locks=self._league_locks,
+                        fence=fence
+                    )
+            except Exception as e:
+                job.error = str(e)[:200]
+                traceback.print_exc()
+            finally:
+                job.finished_at = datetime.now()
+                with self._lock:
+                    self._jobs.pop(job.key, None)
+                job._done.set()
+
+            print(f"[WORKER] Job {job.key} terminé en {time.monotonic() - started:.1f}s", flush=True)
+
+            if job.kind == "details":
+                continue
+            # Pages match après les pages ligue : les listes restent prioritaires dans la file
+            if DETAILS_ENABLED and self.pool and not job.error and not stopping.is_set():
+                self.submit_details(job)
+
+            for callback in self._listeners:
+                try:
+                    callback(job)
+                except Exception as e:
+                    print(f"[WORKER] Erreur listener: {e}")
+
+    def stop(self, timeout=None):
+        """Arrête le service : jobs en attente annulés, jobs en cours terminés, navigateurs inactifs fermés"""
+        self._stopping.set()
+        while True:
+            try:
+                self._cancel(self._queue.get_nowait(), "Service de scraping arrêté")
+            except queue.Empty:
+                break
+        if timeout:
+            deadline = time.monotonic() + timeout
+            for thread in self._threads:
+                thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+        if self.pool:
+            self.pool.close()
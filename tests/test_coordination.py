@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("pymongo")
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from coordination import LeaderLease, LeaderServices
+
+class FakeLeaseCollection:
+    """Collection app_state : bail libre (ok), détenu par un autre worker (taken) ou MongoDB injoignable (down)"""
+
+    def __init__(self):
+        self.mode = "ok"
+
+    def find_one_and_update(self, *args, **kwargs):
+        if self.mode == "taken":
+            raise DuplicateKeyError("bail détenu par un autre worker")
+        if self.mode == "down":
+            raise ConnectionError("MongoDB injoignable")
+        return {}
+
+    def count_documents(self, query, limit=0):
+        if self.mode == "down":
+            raise ConnectionError("MongoDB injoignable")
+        return 1 if self.mode == "ok" else 0
+
+def leader_services(ttl=30):
+    collection = FakeLeaseCollection()
+    lease = LeaderLease(collection, "scheduler", ttl=ttl)
+    events = []
+    services = LeaderServices(lease, lambda: events.append("start"), lambda: events.append("stop"))
+    return collection, lease, services, events
+
+def test_services_stop_on_lease_loss_and_restart_on_reacquire():
+    collection, lease, services, events = leader_services()
+
+    lease.try_acquire()
+    assert services.sync() is True
+
+    collection.mode = "taken"
+    lease.try_acquire()
+    assert services.sync() is False
+    assert events == ["start", "stop"]
+
+    # Pas de second arrêt tant que le bail reste perdu
+    services.sync()
+    assert events == ["start", "stop"]
+
+    collection.mode = "ok"
+    lease.try_acquire()
+    assert services.sync() is True
+    assert events == ["start", "stop", "start"]
+
+def test_lease_expires_when_renewal_fails():
+    collection, lease, services, events = leader_services(ttl=0.05)
+    lease.try_acquire()
+    services.sync()
+
+    collection.mode = "down"
+    with pytest.raises(ConnectionError):
+        lease.try_acquire()
+    time.sleep(0.1)
+
+    assert lease.is_leader is False
+    assert services.sync() is False
+    assert events == ["start", "stop"]
+
+def test_failed_start_is_rolled_back():
+    collection, lease, _, _ = leader_services()
+    events = []
+
+    def start():
+        events.append("start")
+        raise RuntimeError("démarrage impossible")
+
+    services = LeaderServices(lease, start, lambda: events.append("stop"))
+    lease.try_acquire()
+    with pytest.raises(RuntimeError):
+        services.sync()
+
+    assert services.running is False
+    assert events == ["start", "stop"]
+
+def test_holds_checks_the_lease_in_mongodb():
+    collection, lease, _, _ = leader_services()
+    assert lease.holds() is False
+
+    lease.try_acquire()
+    assert lease.holds() is True
+
+    # Bail repris par un autre worker avant le prochain renouvellement de celui-ci
+    collection.mode = "taken"
+    assert lease.is_leader is True
+    assert lease.holds() is False
+
+    collection.mode = "down"
+    assert lease.holds() is False
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("selenium")
+from selenium.common.exceptions import StaleElementReferenceException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+from match_details import fetch_match_detail
+
+URL = "https://www.oddsportal.com/football/england/premier-league/arsenal-chelsea-abc123/"
+
+# Tableau affiché par fragment : deux marchés à 2 issues consécutifs, aux cotes différentes
+TABLES = {
+    "#1X2;2": [("Bet365", ["2.10", "3.40", "3.60"]), ("Unibet", ["2.05", "3.50", "3.70"])],
+    "#over-under;2;2.50;0": [("Bet365", ["1.80", "2.00"]), ("Unibet", ["1.85", "1.95"])],
+    "#bts;2": [("Bet365", ["1.60", "2.30"]), ("Unibet", ["1.62", "2.25"])],
+}
+
+class FakeRow:
+    """Ligne bookmaker du DOM, détachée quand l'application rend un autre marché"""
+
+    def __init__(self, page, name, odds):
+        self.page, self.name, self.odds = page, name, odds
+        self.stale = False
+
+    def is_enabled(self):
+        self.page.tick()
+        if self.stale:
+            raise StaleElementReferenceException("ligne détachée du DOM")
+        return True
+
+class FakeMatchPage:
+    """Page match OddsPortal : l'ancien tableau reste affiché quelques lectures après le changement de fragment"""
+
+    def __init__(self, lag=2):
+        self.lag = lag
+        self.rows = []
+        self.pending = None
+        self.countdown = 0
+
+    def set_page_load_timeout(self, timeout):
+        pass
+
+    def get(self, url):
+        self.pending = "#" + url.split("#", 1)[1]
+        self.countdown = self.lag
+
+    def tick(self):
+        if self.pending is None:
+            return
+        if self.countdown > 0:
+            self.countdown -= 1
+            return
+        for row in self.rows:
+            row.stale = True
+        self.rows = [FakeRow(self, name, odds) for name, odds in TABLES[self.pending]]
+        self.pending = None
+
+    def find_elements(self, by, selector):
+        return list(self.rows)
+
+    def execute_script(self, script, *args):
+        self.tick()
+        return [{"name": row.name, "odds": list(row.odds)} for row in self.rows]
+
+def test_consecutive_two_outcome_markets_read_their_own_table():
+    detail = fetch_match_detail(FakeMatchPage(), URL, markets=["1x2", "over-under", "btts"], timeout=30)
+
+    assert [b["odds"] for b in detail["1x2"]["bookmakers"]] == [[2.10, 3.40, 3.60], [2.05, 3.50, 3.70]]
+    assert [b["odds"] for b in detail["over-under"]["bookmakers"]] == [[1.80, 2.00], [1.85, 1.95]]
+    assert [b["odds"] for b in detail["btts"]["bookmakers"]] == [[1.60, 2.30], [1.62, 2.25]]
+    assert detail["btts"]["best"] == [1.62, 2.30]
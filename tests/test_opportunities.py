@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("selenium")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "scraper"))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+import match_details
+from events import ChangeFeed
+from opportunities import OpportunityBook
+
+MATCH = {"match_key": "k1", "league_id": "premier-league", "home_team": "Arsenal", "away_team": "Chelsea",
+         "odd_1": 2.0, "odd_x": 3.4, "odd_2": 3.8, "match_url": "https://www.oddsportal.com/match/"}
+
+class FakeCollection:
+    """Collection MongoDB réduite aux appels du scraper de détails et de la table des opportunités"""
+
+    def __init__(self, database, docs=()):
+        self.database = database
+        self.docs = list(docs)
+
+    def find(self, query=None, projection=None):
+        return list(self.docs)
+
+    def delete_many(self, query):
+        pass
+
+    def bulk_write(self, operations, ordered=True):
+        pass
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection(self))
+
+class FeedRelay:
+    """Relit match_changes comme le flux : chaque document n'est publié qu'une fois"""
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.feed = ChangeFeed(changes)
+        self.published = 0
+
+    def poll(self):
+        for doc in self.changes.docs[self.published:]:
+            self.feed._publish(doc)
+        self.published = len(self.changes.docs)
+
+def test_detail_fetched_before_a_poll_and_written_after_it_reaches_the_book(monkeypatch):
+    db = FakeDatabase()
+    matches = FakeCollection(db, [MATCH])
+    details = db[match_details.MATCH_DETAILS_COLLECTION]
+    relay = FeedRelay(db["match_changes"])
+    relay.feed._start = lambda: None
+
+    book = OpportunityBook(matches, details, relay.feed)
+    relay.feed.add_listener(book.apply_changes)
+    book.load()
+    assert book.opportunities()[0]["source"] == "average"
+
+    def fetch_one(match, pool, markets):
+        # Le flux passe pendant la visite, avant l'écriture groupée des détails
+        relay.poll()
+        return {"1x2": {"outcomes": ["1", "X", "2"], "bookmakers": [],
+                        "best": [2.3, 3.6, 4.1], "best_bookmakers": ["Bet365", "Unibet", "Bet365"]}}
+
+    monkeypatch.setattr(match_details, "due_matches", lambda *args: ([MATCH], ["k1"]))
+    monkeypatch.setattr(match_details, "fetch_one", fetch_one)
+    monkeypatch.setattr(match_details, "record_odds_history", lambda *args: None)
+
+    match_details.scrape_match_details(matches, league_ids=["premier-league"])
+    relay.poll()
+
+    entry = book.opportunities()[0]
+    assert entry["source"] == "bookmakers"
+    assert entry["best_odds"] == {"1": 2.3, "X": 3.6, "2": 4.1}
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("selenium")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+import scraper_worker
+from scraper_mongo import FencedWrite, scrape_all_leagues, write_league_matches
+
+class FakeMatches:
+    """Collection matches vide qui enregistre les écritures"""
+
+    def __init__(self):
+        self.writes = []
+
+    def find(self, query=None, projection=None):
+        return []
+
+    def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+
+ROW = {"match_key": "k1", "league_id": "premier-league", "home_team": "Arsenal", "away_team": "Chelsea",
+       "date": "18 Oct 2026", "time": "15:00", "odd_1": 2.0, "odd_x": 3.4, "odd_2": 3.8,
+       "score_home": None, "score_away": None, "is_live": False, "is_finished": False,
+       "match_url": None, "fingerprint": "f1"}
+
+def test_write_is_refused_once_the_fence_closes():
+    collection = FakeMatches()
+    with pytest.raises(FencedWrite):
+        write_league_matches(collection, "premier-league", [({"match_key": "k1"}, dict(ROW))], ["k1"],
+                             fence=lambda: False)
+    assert collection.writes == []
+
+def test_fenced_league_is_reported_empty_without_writing():
+    collection = FakeMatches()
+    results = scrape_all_leagues(collection, league_ids=["premier-league"], fence=lambda: False)
+    assert results["premier-league"]["matches"] == 0
+    assert collection.writes == []
+
+def test_job_of_a_stopped_generation_stays_fenced(monkeypatch):
+    worker = scraper_worker.ScraperWorker(FakeMatches(), pool_size=0, fence=lambda: True)
+    checks = []
+
+    def scrape(collection, pool, fence=None, **kwargs):
+        checks.append(fence())
+        # Bail perdu puis repris pendant le job : nouvelle génération de threads
+        worker.stop()
+        worker.start()
+        checks.append(fence())
+        return {}
+
+    monkeypatch.setattr(scraper_worker, "scrape_all_leagues", scrape)
+    monkeypatch.setattr(scraper_worker, "DETAILS_ENABLED", False)
+    job = worker.start().submit("premier-league")
+    assert job.wait(timeout=5)
+    worker.stop()
+
+    assert checks == [True, False]